@@ -0,0 +1,431 @@
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import logging
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from urllib.parse import parse_qsl
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# 遇到这些状态码时按退避策略重试
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# 缓存键中不保存明文、只保存摘要的凭据参数
+SECRET_PARAMS = frozenset({'access_token', 'key'})
+
+
+class TokenBucket:
+    """异步令牌桶：平均每秒rate个请求，最多允许capacity个突发请求"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None
+        self._loop = None
+
+    async def acquire(self):
+        # asyncio.Lock绑定到创建它的事件循环，换了循环（例如再次asyncio.run）就重新创建
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._loop is not loop:
+            self._lock = asyncio.Lock()
+            self._loop = loop
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class ResponseCache:
+    """GET响应缓存：内存LRU层加可选的磁盘层，按端点设置TTL，过期后可用ETag条件请求重新验证
+
+    键由端点URL与参数组成，凭据参数替换为摘要，不同令牌的结果不会混用，令牌也不会写入磁盘。
+    ttls按端点后缀设置过期秒数，例如{'me': 600, 'channels': 3600}，未匹配的用default_ttl。
+    同一实例可被多个客户端共享，线程安全。
+    """
+
+    def __init__(self, max_entries=1024, default_ttl=300, ttls=None, disk_dir=None, disk_max_entries=10000):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.ttls = ttls or {}
+        self.disk_dir = disk_dir
+        self.disk_max_entries = disk_max_entries
+        self.entries = OrderedDict()
+        self._disk_count = None
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'revalidated': 0, 'stale': 0, 'evictions': 0,
+                      'disk_evictions': 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(url, params=None):
+        """返回(缓存键, 端点)；URL中的查询参数并入params，凭据参数替换为SHA-256摘要"""
+        endpoint, _, query = url.partition('?')
+        params = dict(parse_qsl(query), **(params or {}))
+        redacted = []
+        for name, value in sorted(params.items()):
+            if name in SECRET_PARAMS and value is not None:
+                value = 'sha256:' + hashlib.sha256(str(value).encode()).hexdigest()[:32]
+            redacted.append([name, str(value)])
+        key = json.dumps([endpoint, redacted], separators=(',', ':'))
+        return key, endpoint
+
+    def ttl_for(self, endpoint):
+        # 按完整路径段匹配后缀，'me'不会匹配到/home或/{id}/game
+        path = '/' + endpoint.rstrip('/')
+        for suffix, ttl in self.ttls.items():
+            if path.endswith('/' + suffix.strip('/')):
+                return ttl
+        return self.default_ttl
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, hashlib.sha256(key.encode()).hexdigest() + '.json')
+
+    def lookup(self, key):
+        """返回缓存条目（可能已过期，由调用方决定是否重新验证），没有则返回None"""
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+        if entry is None and self.disk_dir:
+            entry = self._read_disk(key)
+            if entry is not None:
+                self._put_memory(key, entry)
+                if entry['expires_at'] > time.time():
+                    self._count('disk_hits')
+        return entry
+
+    def _read_disk(self, key):
+        path = self._disk_path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            os.utime(path)  # 磁盘层按修改时间做LRU
+        except (OSError, ValueError):
+            return None
+        # 文件名是键的哈希，核对原始键以防碰撞
+        return entry if entry.get('key') == key else None
+
+    def _put_memory(self, key, entry):
+        with self._lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def _write_disk(self, key, entry):
+        path = self._disk_path(key)
+        is_new = not os.path.exists(path)
+        temp_path = f'{path}.{threading.get_ident()}.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            # 只在文件数可能超过上限时才扫描目录
+            if self._disk_count is None:
+                self._disk_count = sum(1 for name in os.listdir(self.disk_dir) if name.endswith('.json'))
+            elif is_new:
+                self._disk_count += 1
+            if self._disk_count <= self.disk_max_entries:
+                return
+        # 其他线程可能同时在淘汰文件，读取修改时间时跳过已经消失的文件
+        files = []
+        with os.scandir(self.disk_dir) as it:
+            for item in it:
+                if not item.name.endswith('.json'):
+                    continue
+                try:
+                    files.append((item.stat().st_mtime, item.path))
+                except OSError:
+                    continue
+        with self._lock:
+            self._disk_count = len(files)
+        paths = [path for _, path in sorted(files)]
+        for old_path in paths[:len(paths) - self.disk_max_entries]:
+            try:
+                os.remove(old_path)
+            except OSError:
+                continue
+            with self._lock:
+                self._disk_count -= 1
+                self.stats['disk_evictions'] += 1
+
+    def store(self, key, endpoint, response):
+        """缓存一个200响应，返回缓存条目"""
+        entry = {
+            'key': key,
+            'url': response.url.split('?')[0],
+            'status': response.status_code,
+            'content': base64.b64encode(response.content).decode('ascii'),
+            'headers': {name: response.headers[name] for name in ('Content-Type', 'ETag') if name in response.headers},
+            'expires_at': time.time() + self.ttl_for(endpoint)
+        }
+        self._put_memory(key, entry)
+        if self.disk_dir:
+            # 磁盘缓存写入失败不应让已经成功的请求失败
+            try:
+                self._write_disk(key, entry)
+            except OSError as e:
+                logging.warning(f'Failed to write cache entry for {entry["url"]}: {e}')
+        return entry
+
+    def refresh(self, key, endpoint, entry):
+        """304之后延长条目的有效期"""
+        entry = dict(entry, expires_at=time.time() + self.ttl_for(endpoint))
+        self._put_memory(key, entry)
+        if self.disk_dir:
+            # 磁盘缓存写入失败不应让已经成功的请求失败
+            try:
+                self._write_disk(key, entry)
+            except OSError as e:
+                logging.warning(f'Failed to write cache entry for {entry["url"]}: {e}')
+        return entry
+
+    def _count(self, name):
+        with self._lock:
+            self.stats[name] += 1
+
+    @staticmethod
+    def to_response(entry):
+        """由缓存条目构造requests.Response，from_cache属性为True"""
+        response = requests.Response()
+        response.status_code = entry['status']
+        response._content = base64.b64decode(entry['content'])
+        response.headers = CaseInsensitiveDict(entry['headers'])
+        response.url = entry['url']
+        response.encoding = 'utf-8'
+        response.from_cache = True
+        return response
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.json'):
+                    os.remove(os.path.join(self.disk_dir, name))
+            self._disk_count = 0
+
+
+class APIClient:
+    """各API客户端的公共基类：复用长连接的Session、超时、带抖动退避的重试与请求统计
+
+    连接池大小、超时与重试参数都可调；base_url可指向本地桩服务器用于测试。
+    同一实例可在多个线程间共享，统计计数有锁保护。
+    rate_limit（每秒请求数）与rate_burst设置该客户端的令牌桶，限制fetch_many的请求速率。
+    cache为可选的ResponseCache，可在多个客户端间共享，只缓存GET的200响应。
+    """
+
+    def __init__(self, base_url, timeout=(3.05, 10), max_retries=3, backoff_factor=0.5, backoff_max=30.0,
+                 pool_connections=10, pool_maxsize=10, session=None, rate_limit=None, rate_burst=None, cache=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backoff_max = backoff_max
+        self.session = session or requests.Session()
+        self.pool_connections = pool_connections
+        self.mount_adapter(pool_maxsize)
+        self.rate_limiter = TokenBucket(rate_limit, rate_burst) if rate_limit else None
+        self.cache = cache
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def mount_adapter(self, pool_maxsize):
+        # 重试由本类处理，适配器本身不重试，只负责连接池
+        self.pool_maxsize = pool_maxsize
+        adapter = HTTPAdapter(pool_connections=self.pool_connections, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = {
+                'requests': 0,       # 发出的HTTP请求数（含重试）
+                'retries': 0,        # 重试次数
+                'failures': 0,       # 重试用尽后仍失败的调用数
+                'latency_total': 0.0,
+                'latency_max': 0.0
+            }
+
+    def latency_summary(self):
+        """返回请求次数、平均与最大延迟（秒）及重试计数"""
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats['latency_mean'] = stats['latency_total'] / stats['requests'] if stats['requests'] else 0.0
+        return stats
+
+    def _record(self, latency, retried=False, failed=False):
+        with self._stats_lock:
+            self.stats['requests'] += 1
+            self.stats['latency_total'] += latency
+            self.stats['latency_max'] = max(self.stats['latency_max'], latency)
+            self.stats['retries'] += int(retried)
+            self.stats['failures'] += int(failed)
+
+    def backoff_delay(self, attempt, response=None):
+        """第attempt次重试前的等待时间：全抖动指数退避，429带Retry-After时以其为准"""
+        if response is not None and response.status_code == 429:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return min(self.backoff_max, float(retry_after))
+        return random.uniform(0, min(self.backoff_max, self.backoff_factor * (2 ** attempt)))
+
+    def request(self, method, url, **kwargs):
+        """发送请求；429/5xx、连接错误与超时会重试，返回最后一次的响应（不检查状态码）"""
+        if not url.startswith(('http://', 'https://')):
+            url = self.base_url + url
+        kwargs.setdefault('timeout', self.timeout)
+
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            start = time.perf_counter()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                self._record(time.perf_counter() - start, retried=not last_attempt, failed=last_attempt)
+                if last_attempt:
+                    raise
+                delay = self.backoff_delay(attempt)
+                logging.warning(f'{method} {url.split("?")[0]} failed ({e.__class__.__name__}), '
+                                f'retrying in {delay:.2f}s')
+                time.sleep(delay)
+                continue
+
+            retry = response.status_code in RETRY_STATUSES
+            self._record(time.perf_counter() - start, retried=retry and not last_attempt,
+                         failed=retry and last_attempt)
+            if not retry or last_attempt:
+                return response
+            delay = self.backoff_delay(attempt, response)
+            logging.warning(f'{method} {url.split("?")[0]} returned {response.status_code}, '
+                            f'retrying in {delay:.2f}s')
+            response.close()
+            time.sleep(delay)
+
+    def get(self, url, params=None, **kwargs):
+        if self.cache is None:
+            return self.request('GET', url, params=params, **kwargs)
+        if not url.startswith(('http://', 'https://')):
+            url = self.base_url + url
+
+        key, endpoint = self.cache.make_key(url, params)
+        entry = self.cache.lookup(key)
+        if entry is not None and entry['expires_at'] > time.time():
+            self.cache._count('hits')
+            return self.cache.to_response(entry)
+
+        etag = entry['headers'].get('ETag') if entry else None
+        if etag:
+            # 过期条目带ETag时发条件请求，304说明内容未变，不消耗响应体
+            headers = dict(kwargs.pop('headers', None) or {}, **{'If-None-Match': etag})
+            response = self.request('GET', url, params=params, headers=headers, **kwargs)
+            if response.status_code == 304:
+                self.cache._count('revalidated')
+                return self.cache.to_response(self.cache.refresh(key, endpoint, entry))
+        else:
+            response = self.request('GET', url, params=params, **kwargs)
+        self.cache._count('stale' if entry else 'misses')
+        if response.status_code == 200:
+            self.cache.store(key, endpoint, response)
+        return response
+
+    def post(self, url, data=None, **kwargs):
+        return self.request('POST', url, data=data, **kwargs)
+
+    @staticmethod
+    def batches(ids, batch_size):
+        """去重（保持顺序）后按batch_size切分ID列表"""
+        ids = list(dict.fromkeys(ids))
+        return [ids[i:i + batch_size] for i in range(0, len(ids), batch_size)]
+
+    def paginate(self, fetch_page, prefetch=False):
+        """逐条产出分页结果；fetch_page(cursor)返回(本页条目, 下一页游标)，首页游标为None，
+        游标为空时结束。prefetch为True时在后台线程预取下一页，内存中最多同时有两页。
+        """
+        if not prefetch:
+            cursor = None
+            while True:
+                items, cursor = fetch_page(cursor)
+                yield from items
+                if not cursor:
+                    return
+
+        executor = ThreadPoolExecutor(max_workers=1)
+        future = executor.submit(fetch_page, None)
+        try:
+            while future is not None:
+                items, cursor = future.result()
+                future = executor.submit(fetch_page, cursor) if cursor else None
+                yield from items
+        finally:
+            # 提前停止迭代时不等待正在预取的页
+            if future is not None:
+                future.cancel()
+            executor.shutdown(wait=False)
+
+    async def fetch_many(self, items, fetch, concurrency=10):
+        """并发地对每个item调用fetch(item)，按完成顺序异步产出(item, 结果, 异常)
+
+        同时进行的请求不超过concurrency个，并受客户端令牌桶限速；某项失败时结果为None、
+        异常放在第三项，不影响其他项。items按需读取，可以是很大的迭代器。
+        阻塞的fetch在线程池中运行，共用同一个带连接池的Session。
+        """
+        if concurrency > self.pool_maxsize:
+            # 连接池小于并发数时多出的连接用完即弃，无法复用
+            self.mount_adapter(concurrency)
+        loop = asyncio.get_running_loop()
+        items = iter(items)
+
+        async def run(item):
+            try:
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire()
+                return item, await loop.run_in_executor(executor, fetch, item), None
+            except Exception as e:
+                return item, None, e
+
+        def schedule(count):
+            for item in items:
+                pending.add(asyncio.ensure_future(run(item)))
+                count -= 1
+                if not count:
+                    break
+
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        pending = set()
+        try:
+            schedule(concurrency)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                schedule(len(done))
+                for task in done:
+                    yield task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
@@ -1,5 +1,7 @@
 import requests
 import logging
+import json
+from APIClient import APIClient
 
 # 配置日志
 logging.basicConfig(
@@ -8,20 +10,21 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-class FacebookAPI:
-    def __init__(self, access_token):
+class FacebookAPI(APIClient):
+    def __init__(self, access_token, base_url='https://graph.facebook.com/v12.0/', **client_options):
+        # client_options传给APIClient：timeout、max_retries、pool_maxsize等
+        super().__init__(base_url, **client_options)
         self.access_token = access_token
-        self.base_url = 'https://graph.facebook.com/v12.0/'
 
-    def get_user_info(self):
+    def get_user_info(self, access_token=None):
         url = f'{self.base_url}me'
         params = {
-            'access_token': self.access_token,
+            'access_token': access_token or self.access_token,
             'fields': 'id,name,email,picture'
         }
 
         try:
-            response = requests.get(url, params=params)
+            response = self.get(url, params=params)
             response.raise_for_status()  # 抛出HTTPError异常
             user_info = response.json()
             logging.info('User info retrieved successfully.')
@@ -30,6 +33,69 @@ class FacebookAPI:
             logging.error(f'Error retrieving user info: {e}')
             raise Exception(f'Error retrieving user info: {response.text}')
 
+    def get_users_info_batch(self, user_ids, fields='id,name,picture', batch_size=50):
+        """用Graph批量请求获取多个用户（或页面）信息，每批最多50个子请求
+
+        返回({ID: 信息}, {缺失的ID: 原因})；子请求失败或未被处理（结果为null）的ID记为缺失。
+        """
+        found = {}
+        missing = {}
+        for batch in self.batches(user_ids, min(batch_size, 50)):
+            data = {
+                'access_token': self.access_token,
+                'include_headers': 'false',
+                'batch': json.dumps([{'method': 'GET', 'relative_url': f'{user_id}?fields={fields}'}
+                                     for user_id in batch])
+            }
+            try:
+                response = self.post(self.base_url, data=data)
+                response.raise_for_status()  # 抛出HTTPError异常
+                results = response.json()
+            except requests.exceptions.HTTPError as e:
+                logging.error(f'Error retrieving user batch: {e}')
+                raise Exception(f'Error retrieving user batch: {response.text}')
+            # 未返回的尾部子请求同样视为未处理
+            results = list(results) + [None] * (len(batch) - len(results))
+            for user_id, result in zip(batch, results):
+                if result is None:
+                    missing[user_id] = 'not processed'
+                    continue
+                body = json.loads(result.get('body') or 'null')
+                if result.get('code') == 200 and body:
+                    found[user_id] = body
+                else:
+                    error = body.get('error', {}).get('message') if isinstance(body, dict) else None
+                    missing[user_id] = error or f"HTTP {result.get('code')}"
+        logging.info(f'User batch lookup: {len(found)} found, {len(missing)} missing.')
+        return found, missing
+
+    def iter_edge(self, node_id, edge, fields=None, page_size=100, prefetch=False):
+        """逐条产出节点某条边（如me/posts、page_id/feed）的结果，沿paging.next惰性翻页；
+        prefetch为True时后台预取下一页
+        """
+        def fetch_page(next_url):
+            # next链接已包含全部查询参数
+            params = None
+            if not next_url:
+                params = {'limit': page_size, 'access_token': self.access_token}
+                if fields:
+                    params['fields'] = fields
+            try:
+                response = self.get(next_url or f'{self.base_url}{node_id}/{edge}', params=params)
+                response.raise_for_status()  # 抛出HTTPError异常
+                page = response.json()
+            except requests.exceptions.HTTPError as e:
+                logging.error(f'Error retrieving {edge} page: {e}')
+                raise Exception(f'Error retrieving {edge} page: {response.text}')
+            return page.get('data', []), page.get('paging', {}).get('next')
+
+        return self.paginate(fetch_page, prefetch)
+
+    async def get_user_infos(self, access_tokens, concurrency=10):
+        """并发获取多个访问令牌对应的用户信息，按完成顺序异步产出(访问令牌, 用户信息, 异常)"""
+        async for result in self.fetch_many(access_tokens, self.get_user_info, concurrency):
+            yield result
+
 # 使用示例
 if __name__ == '__main__':
     access_token = 'YOUR_ACCESS_TOKEN'  # 替换为实际的用户访问令牌
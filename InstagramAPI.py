@@ -1,5 +1,6 @@
 import requests
 import logging
+from APIClient import APIClient
 
 # 配置日志
 logging.basicConfig(
@@ -8,20 +9,21 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-class InstagramAPI:
-    def __init__(self, access_token):
+class InstagramAPI(APIClient):
+    def __init__(self, access_token, base_url='https://graph.instagram.com/', **client_options):
+        # client_options传给APIClient：timeout、max_retries、pool_maxsize等
+        super().__init__(base_url, **client_options)
         self.access_token = access_token
-        self.base_url = 'https://graph.instagram.com/'
 
-    def get_user_info(self):
+    def get_user_info(self, access_token=None):
         url = f'{self.base_url}me'
         params = {
             'fields': 'id,username,account_type,media_count',
-            'access_token': self.access_token
+            'access_token': access_token or self.access_token
         }
 
         try:
-            response = requests.get(url, params=params)
+            response = self.get(url, params=params)
             response.raise_for_status()  # 抛出HTTPError异常
             user_info = response.json()
             logging.info('User info retrieved successfully.')
@@ -30,6 +32,28 @@ class InstagramAPI:
             logging.error(f'Error retrieving user info: {e}')
             raise Exception(f'Error retrieving user info: {response.text}')
 
+    def iter_media(self, user_id='me', fields='id,caption,media_type,media_url,permalink,timestamp',
+                   page_size=100, prefetch=False):
+        """逐条产出用户的媒体（media边），沿paging.next惰性翻页；prefetch为True时后台预取下一页"""
+        def fetch_page(next_url):
+            # next链接已包含全部查询参数
+            params = None if next_url else {'fields': fields, 'limit': page_size, 'access_token': self.access_token}
+            try:
+                response = self.get(next_url or f'{self.base_url}{user_id}/media', params=params)
+                response.raise_for_status()  # 抛出HTTPError异常
+                page = response.json()
+            except requests.exceptions.HTTPError as e:
+                logging.error(f'Error retrieving media page: {e}')
+                raise Exception(f'Error retrieving media page: {response.text}')
+            return page.get('data', []), page.get('paging', {}).get('next')
+
+        return self.paginate(fetch_page, prefetch)
+
+    async def get_user_infos(self, access_tokens, concurrency=10):
+        """并发获取多个访问令牌对应的用户信息，按完成顺序异步产出(访问令牌, 用户信息, 异常)"""
+        async for result in self.fetch_many(access_tokens, self.get_user_info, concurrency):
+            yield result
+
 # 使用示例
 if __name__ == '__main__':
     access_token = 'YOUR_ACCESS_TOKEN'  # 替换为实际的用户访问令牌
@@ -1,19 +1,147 @@
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
+import numpy as np
+import argparse
 import logging
+import io
 import os
+import re
+import sys
+from datetime import datetime, timezone
+
+# 解析时每行拆分出的字段：IPv4的四个字段、原逗号位置的空字段和开放端口数量
+FIELDS = ['a', 'b', 'c', 'd', 'separator', 'Open Ports']
+# 解析时加在每块开头的哨兵行
+SENTINEL_LINE = b'0.0.0.0,0\n'
+# 空行（允许只有空白字符）
+BLANK_LINE = re.compile(rb'^[ \t\r]*\n', re.MULTILINE)
+# 列式输出格式（需要pyarrow）
+COLUMNAR_FORMATS = ('parquet', 'feather')
+# 扫描历史中每次运行一个分区目录，目录名为"scan_time=<UTC时间戳>"
+SCAN_PARTITION_PREFIX = 'scan_time='
+SCAN_TIME_FORMAT = '%Y%m%dT%H%M%S%fZ'
+SCAN_PART_FILE = 'part-0.parquet'
+
+
+def import_pyplot():
+    """按需导入pyplot；绘图只输出文件，导入前固定使用无界面的Agg后端"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def ips_to_strings(ips):
+    """将uint32编码的IP数组转换为点分十进制字符串"""
+    ips = np.asarray(ips, dtype=np.uint32)
+    octets = [pd.Series((ips >> shift) & 0xFF).astype(str) for shift in (24, 16, 8, 0)]
+    return octets[0] + '.' + octets[1] + '.' + octets[2] + '.' + octets[3]
+
+
+def sorted_scan_arrays(df):
+    """返回按IP升序、IP唯一的(IP数组, 端口数数组)；同一IP出现多次时端口数相加"""
+    ips = df['IP'].to_numpy(dtype=np.uint32)
+    counts = df['Open Ports'].to_numpy(dtype=np.uint32)
+    if len(ips) > 1 and not (ips[1:] > ips[:-1]).all():
+        # IP与端口数拼成一个uint64排序，比argsort后再按索引重排快得多
+        packed = np.sort((ips.astype(np.uint64) << np.uint64(32)) | counts)
+        ips = (packed >> np.uint64(32)).astype(np.uint32)
+        counts = (packed & np.uint64(0xFFFFFFFF)).astype(np.int64)
+        starts = np.flatnonzero(np.concatenate(([True], ips[1:] != ips[:-1])))
+        if len(starts) < len(ips):
+            ips, counts = ips[starts], np.add.reduceat(counts, starts)
+        return ips, counts
+    return ips, counts.astype(np.int64)
+
+
+def diff_scans(old_df, new_df):
+    """比较两次扫描，返回开放端口数发生变化的主机（按IP升序）
+
+    Status为changed（端口数变化）、added（只在新扫描中）或removed（只在旧扫描中）；
+    缺失一侧的端口数记为0。两侧都按uint32 IP排序后用searchsorted连接，不做哈希连接
+    """
+    old_ips, old_counts = sorted_scan_arrays(old_df)
+    new_ips, new_counts = sorted_scan_arrays(new_df)
+
+    if len(new_ips):
+        positions = np.searchsorted(new_ips, old_ips)
+        clipped = np.minimum(positions, len(new_ips) - 1)
+        matched = new_ips[clipped] == old_ips
+    else:
+        positions = clipped = np.zeros(len(old_ips), dtype=np.intp)
+        matched = np.zeros(len(old_ips), dtype=bool)
+    in_old = np.zeros(len(new_ips), dtype=bool)
+    in_old[positions[matched]] = True
+
+    common_ips = old_ips[matched]
+    common_before = old_counts[matched]
+    common_after = new_counts[positions[matched]]
+    changed = common_before != common_after
+    removed = ~matched
+    added = ~in_old
+
+    ips = np.concatenate([common_ips[changed], old_ips[removed], new_ips[added]])
+    before = np.concatenate([common_before[changed], old_counts[removed], np.zeros(added.sum(), dtype=np.int64)])
+    after = np.concatenate([common_after[changed], np.zeros(removed.sum(), dtype=np.int64), new_counts[added]])
+    status = np.repeat(np.array([0, 1, 2], dtype=np.int8), [changed.sum(), removed.sum(), added.sum()])
+
+    order = np.argsort(ips, kind='stable')
+    return pd.DataFrame({
+        'IP': ips[order],
+        'Open Ports Before': before[order],
+        'Open Ports After': after[order],
+        'Change': after[order] - before[order],
+        'Status': pd.Categorical.from_codes(status[order], categories=['changed', 'removed', 'added'])
+    })
+
+
+def list_scans(history_dir):
+    """返回扫描历史中已完成写入的扫描时间戳，按时间升序"""
+    if not os.path.isdir(history_dir):
+        return []
+    return sorted(
+        name[len(SCAN_PARTITION_PREFIX):] for name in os.listdir(history_dir)
+        if name.startswith(SCAN_PARTITION_PREFIX) and os.path.isfile(os.path.join(history_dir, name, SCAN_PART_FILE))
+    )
+
+
+def load_scan(history_dir, scan_time=None):
+    """读取扫描历史中的一次扫描（默认最新一次），IP为uint32编码"""
+    scans = list_scans(history_dir)
+    if scan_time is None:
+        if not scans:
+            raise FileNotFoundError(f'No scans found in {history_dir}')
+        scan_time = scans[-1]
+    elif scan_time not in scans:
+        raise FileNotFoundError(f'Scan {scan_time} not found in {history_dir}')
+    return pd.read_parquet(os.path.join(history_dir, SCAN_PARTITION_PREFIX + scan_time, SCAN_PART_FILE),
+                           columns=['IP', 'Open Ports'])
+
 
 class OpenPortsAnalysis:
-    def __init__(self, ip_file):
+    def __init__(self, ip_file, chunk_bytes=16 * 1024 * 1024):
         self.ip_file = ip_file
-        self.data = self.load_ips()
-        self.df = pd.DataFrame(self.data)
+        self.chunk_bytes = chunk_bytes
         self.log_file = 'analysis.log'
         self.csv_file = 'open_ports_data.csv'
         self.plot_file = 'open_ports_plot.png'
+        self.columnar_files = {'parquet': 'open_ports_data.parquet', 'feather': 'open_ports_data.feather'}
+        self.history_dir = 'scan_history'
+        self.diff_file = 'open_ports_diff.csv'
+        self.malformed_lines = 0
+        self._df = None
         self.setup_logging()
 
+    @property
+    def df(self):
+        """第一次使用时才读取IP文件；IP列为uint32编码，开放端口数为uint32"""
+        if self._df is None:
+            self._df = self.load_ips()
+        return self._df
+
+    @df.setter
+    def df(self, df):
+        self._df = df
+
     def setup_logging(self):
         logging.basicConfig(
             filename=self.log_file,
@@ -22,50 +150,308 @@ class OpenPortsAnalysis:
         )
         logging.info('Logging setup complete.')
 
+    def iter_blocks(self):
+        """按块读取文件，每块都在行尾处截断"""
+        with open(self.ip_file, 'rb') as file:
+            remainder = b''
+            while True:
+                block = file.read(self.chunk_bytes)
+                if not block:
+                    break
+                block = remainder + block
+                cut = block.rfind(b'\n') + 1
+                remainder = block[cut:]
+                if cut:
+                    yield block[:cut]
+            if remainder:
+                yield remainder + b'\n'
+
+    def parse_block(self, block):
+        """解析一块"IP地址,开放端口数量"文本，返回(IP数组, 端口数数组, 格式错误行数)"""
+        lines = block.count(b'\n') - len(BLANK_LINE.findall(block))
+        # 原逗号替换为",,"、IP中的"."替换为","，让C解析器一次性解析出所有数值字段；
+        # 合法行的第五个字段一定为空，字段数过多的行直接跳过。块首加一行格式正确的哨兵行，
+        # 避免首行字段数多一个时被当作索引列
+        data = SENTINEL_LINE + block
+        chunk = pd.read_csv(
+            io.BytesIO(data.replace(b',', b',,').replace(b'.', b',')), header=None, names=FIELDS,
+            skipinitialspace=True, on_bad_lines='skip', skip_blank_lines=True, engine='c'
+        ).iloc[1:]
+        for column in FIELDS:
+            if not pd.api.types.is_numeric_dtype(chunk[column]):
+                chunk[column] = pd.to_numeric(chunk[column], errors='coerce')
+
+        values = chunk.to_numpy(dtype=np.float64)
+        octets, separators, counts = values[:, :4], values[:, 4], values[:, 5]
+        valid = (
+            np.isnan(separators) & ~np.isnan(octets).any(axis=1) & ~np.isnan(counts)
+            & (octets >= 0).all(axis=1) & (octets <= 255).all(axis=1) & (octets % 1 == 0).all(axis=1)
+            & (counts >= 0) & (counts <= np.iinfo(np.uint32).max) & (counts % 1 == 0)
+        )
+
+        octets = octets[valid].astype(np.uint32)
+        ips = (octets[:, 0] << 24) | (octets[:, 1] << 16) | (octets[:, 2] << 8) | octets[:, 3]
+        return ips, counts[valid].astype(np.uint32), lines - int(valid.sum())
+
     def load_ips(self):
         try:
-            with open(self.ip_file, 'r') as file:
-                ips = file.readlines()
-            # 处理IP数据，假定每行的格式为"IP地址,开放端口数量"。
-            data = [line.strip().split(',') for line in ips if line.strip()]
-            # 转换为字典格式
-            return {'IP': [item[0] for item in data], 'Open Ports': [int(item[1]) for item in data]}
+            # 处理IP数据，假定每行的格式为"IP地址,开放端口数量"；按块流式解析，格式错误的行计数后跳过
+            ip_chunks = []
+            count_chunks = []
+            self.malformed_lines = 0
+            for block in self.iter_blocks():
+                ips, counts, malformed = self.parse_block(block)
+                ip_chunks.append(ips)
+                count_chunks.append(counts)
+                self.malformed_lines += malformed
+
+            df = pd.DataFrame({
+                'IP': np.concatenate(ip_chunks) if ip_chunks else np.empty(0, dtype=np.uint32),
+                'Open Ports': np.concatenate(count_chunks) if count_chunks else np.empty(0, dtype=np.uint32)
+            })
+            logging.info(f'Loaded {len(df)} rows from {self.ip_file}, skipped {self.malformed_lines} malformed lines.')
+            return df
         except Exception as e:
             logging.error(f'Error loading IPs from file {self.ip_file}: {e}')
             raise
 
+    def display_df(self):
+        """返回IP为点分十进制字符串的DataFrame，用于输出"""
+        return self.df.assign(IP=ips_to_strings(self.df['IP']))
+
     def generate_csv(self):
         try:
-            self.df.to_csv(self.csv_file, index=False)
+            self.display_df().to_csv(self.csv_file, index=False)
             logging.info(f'CSV file generated: {self.csv_file}')
         except Exception as e:
             logging.error(f'Error generating CSV: {e}')
             raise
 
-    def create_plot(self):
+    def generate_columnar(self, fmt='parquet'):
+        """输出Parquet或Feather文件，IP保持uint32编码，读回时无需重新解析"""
+        try:
+            if fmt not in COLUMNAR_FORMATS:
+                raise ValueError(f'Unknown columnar format: {fmt}')
+            path = self.columnar_files[fmt]
+            if fmt == 'parquet':
+                self.df.to_parquet(path, index=False)
+            else:
+                self.df.to_feather(path)
+            logging.info(f'{fmt.capitalize()} file generated: {path}')
+        except Exception as e:
+            logging.error(f'Error generating {fmt} file: {e}')
+            raise
+
+    def save_scan(self, scan_time=None):
+        """将本次扫描按IP排序后写入扫描历史的新分区，返回分区的时间戳"""
         try:
-            sns.barplot(x='IP', y='Open Ports', data=self.df)
-            plt.title('Open Ports per IP')
-            plt.ylabel('Number of Open Ports')
-            plt.xlabel('IP Address')
-            plt.savefig(self.plot_file)
-            plt.close()  # 关闭图表以释放内存
-            logging.info(f'Plot saved as PNG: {self.plot_file}')
+            if scan_time is None:
+                scan_time = datetime.now(timezone.utc).strftime(SCAN_TIME_FORMAT)
+            partition = os.path.join(self.history_dir, SCAN_PARTITION_PREFIX + scan_time)
+            if os.path.exists(os.path.join(partition, SCAN_PART_FILE)):
+                raise FileExistsError(f'Scan {scan_time} already exists in {self.history_dir}')
+            os.makedirs(partition, exist_ok=True)
+
+            # 先写临时文件再重命名，未写完的分区不会出现在list_scans中
+            ips, counts = sorted_scan_arrays(self.df)
+            temp_path = os.path.join(partition, SCAN_PART_FILE + '.tmp')
+            pd.DataFrame({'IP': ips, 'Open Ports': counts.astype(np.uint32)}).to_parquet(temp_path, index=False)
+            os.replace(temp_path, os.path.join(partition, SCAN_PART_FILE))
+            logging.info(f'Scan saved to history: {partition} ({len(ips)} hosts)')
+            return scan_time
+        except Exception as e:
+            logging.error(f'Error saving scan to {self.history_dir}: {e}')
+            raise
+
+    def diff_with_scan(self, scan_time=None):
+        """与扫描历史中的一次扫描（默认最新一次）比较，返回端口数变化的主机"""
+        try:
+            diff = diff_scans(load_scan(self.history_dir, scan_time), self.df)
+            logging.info(f'Diff against scan {scan_time or "latest"}: {len(diff)} hosts changed.')
+            return diff
+        except Exception as e:
+            logging.error(f'Error diffing against scan history {self.history_dir}: {e}')
+            raise
+
+    def generate_diff_csv(self, diff):
+        """将比较结果输出为CSV，IP为点分十进制字符串"""
+        try:
+            diff.assign(IP=ips_to_strings(diff['IP']).to_numpy()).to_csv(self.diff_file, index=False)
+            logging.info(f'Diff CSV file generated: {self.diff_file}')
+        except Exception as e:
+            logging.error(f'Error generating diff CSV: {e}')
+            raise
+
+    def subnet_rollup(self, prefix_length=24, top_n=None):
+        """按子网聚合，返回每个子网的主机数与开放端口总数（按端口数降序，可只取前N个）"""
+        shift = 32 - prefix_length
+        subnets = (self.df['IP'].to_numpy() >> shift) << shift
+        rollup = (
+            pd.DataFrame({'Subnet': subnets, 'Open Ports': self.df['Open Ports'].to_numpy(dtype=np.uint64)})
+            .groupby('Subnet', sort=False)
+            .agg(Hosts=('Open Ports', 'size'), **{'Open Ports': ('Open Ports', 'sum')})
+        )
+        rollup = (rollup.nlargest(top_n, 'Open Ports') if top_n else
+                  rollup.sort_values('Open Ports', ascending=False)).reset_index()
+        rollup['Subnet'] = ips_to_strings(rollup['Subnet']) + f'/{prefix_length}'
+        return rollup
+
+    def top_hosts(self, top_n=30):
+        """返回开放端口数最多的前N台主机"""
+        top = self.df.nlargest(top_n, 'Open Ports')
+        return top.assign(IP=ips_to_strings(top['IP']).to_numpy())
+
+    def save_bar_plot(self, labels, values, title, xlabel, ylabel):
+        """绘制柱状图，标签过多时旋转显示"""
+        plt = import_pyplot()
+        plt.figure(figsize=(max(8, len(labels) * 0.35), 6))
+        plt.bar(range(len(labels)), values)
+        plt.xticks(range(len(labels)), labels, rotation=90)
+        plt.title(title)
+        plt.ylabel(ylabel)
+        plt.xlabel(xlabel)
+        plt.tight_layout()
+        plt.savefig(self.plot_file)
+        plt.close()  # 关闭图表以释放内存
+
+    def create_plot(self, mode='auto', top_n=30, max_ip_bars=50, bins=50):
+        # mode: ip（每个IP一根柱，只适合小数据量）、subnet24、subnet16、top、histogram；
+        # auto在主机数不超过max_ip_bars时使用ip，否则使用subnet24。聚合模式柱数固定，渲染耗时与主机数无关
+        try:
+            plt = import_pyplot()
+            if mode == 'auto':
+                mode = 'ip' if len(self.df) <= max_ip_bars else 'subnet24'
+
+            if mode == 'ip':
+                import seaborn as sns
+                sns.barplot(x='IP', y='Open Ports', data=self.display_df())
+                plt.title('Open Ports per IP')
+                plt.ylabel('Number of Open Ports')
+                plt.xlabel('IP Address')
+                plt.savefig(self.plot_file)
+                plt.close()  # 关闭图表以释放内存
+            elif mode in ('subnet24', 'subnet16'):
+                prefix_length = int(mode[len('subnet'):])
+                rollup = self.subnet_rollup(prefix_length, top_n)
+                self.save_bar_plot(rollup['Subnet'], rollup['Open Ports'],
+                                   f'Open Ports per /{prefix_length} Subnet (top {len(rollup)})',
+                                   'Subnet', 'Number of Open Ports')
+            elif mode == 'top':
+                top = self.top_hosts(top_n)
+                self.save_bar_plot(top['IP'], top['Open Ports'], f'Top {len(top)} Hosts by Open Ports',
+                                   'IP Address', 'Number of Open Ports')
+            elif mode == 'histogram':
+                counts, edges = np.histogram(self.df['Open Ports'].to_numpy(), bins=bins)
+                plt.figure(figsize=(10, 6))
+                plt.stairs(counts, edges, fill=True)
+                plt.title('Distribution of Open Ports per Host')
+                plt.ylabel('Number of Hosts')
+                plt.xlabel('Number of Open Ports')
+                plt.savefig(self.plot_file)
+                plt.close()  # 关闭图表以释放内存
+            else:
+                raise ValueError(f'Unknown plot mode: {mode}')
+            logging.info(f'Plot ({mode}) saved as PNG: {self.plot_file}')
         except Exception as e:
             logging.error(f'Error creating plot: {e}')
             raise
 
+    def summary(self, top_n=10):
+        """返回扫描概况：主机数、开放端口统计与端口数最多的前N台主机"""
+        counts = self.df['Open Ports'].to_numpy()
+        return {
+            'rows': len(counts),
+            'hosts': len(np.unique(self.df['IP'].to_numpy())),
+            'malformed_lines': self.malformed_lines,
+            'total_open_ports': int(counts.sum(dtype=np.uint64)),
+            'mean_open_ports': float(counts.mean()) if len(counts) else 0.0,
+            'median_open_ports': float(np.median(counts)) if len(counts) else 0.0,
+            'max_open_ports': int(counts.max()) if len(counts) else 0,
+            'top_hosts': list(self.top_hosts(top_n).itertuples(index=False, name=None))
+        }
+
     def run_analysis(self):
         self.generate_csv()
         self.create_plot()
 
 
-if __name__ == '__main__':
-    ip_file = 'ips.txt'  # 指定IP地址文件路径
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Analyse open-port scan results ("IP,open ports" per line).')
+    subparsers = parser.add_subparsers(dest='command')
 
-    try:
-        analysis = OpenPortsAnalysis(ip_file)
-        analysis.run_analysis()
+    def add_command(name, help_text):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument('ip_file', nargs='?', default='ips.txt', help='Scan input file (default: ips.txt).')
+        command.add_argument('--chunk-mb', type=int, default=16, help='Input read block size in MiB.')
+        return command
+
+    csv_command = add_command('csv', 'Write the parsed scan as CSV, Parquet or Feather.')
+    csv_command.add_argument('--format', choices=('csv',) + COLUMNAR_FORMATS, default='csv')
+    csv_command.add_argument('--output', help='Output file (default: open_ports_data.<format>).')
+
+    plot_command = add_command('plot', 'Render a PNG plot (headless).')
+    plot_command.add_argument('--mode', choices=['auto', 'ip', 'subnet24', 'subnet16', 'top', 'histogram'],
+                              default='auto')
+    plot_command.add_argument('--top-n', type=int, default=30, help='Bars in subnet/top modes.')
+    plot_command.add_argument('--bins', type=int, default=50, help='Bins in histogram mode.')
+    plot_command.add_argument('--output', help='Output PNG (default: open_ports_plot.png).')
+
+    summary_command = add_command('summary', 'Print host and open-port statistics.')
+    summary_command.add_argument('--top-n', type=int, default=10, help='Top hosts to list.')
+
+    diff_command = add_command('diff', 'Compare the scan with one stored in the scan history.')
+    diff_command.add_argument('--history-dir', default='scan_history')
+    diff_command.add_argument('--against', help='Scan timestamp to compare with (default: latest).')
+    diff_command.add_argument('--save', action='store_true', help='Store this scan in the history afterwards.')
+    diff_command.add_argument('--output', help='Diff CSV (default: open_ports_diff.csv).')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.command is None:
+        # 不带子命令时保持原有行为：对ips.txt生成CSV和图表
+        OpenPortsAnalysis('ips.txt').run_analysis()
         print('Analysis completed successfully.')
+        return
+
+    analysis = OpenPortsAnalysis(args.ip_file, chunk_bytes=args.chunk_mb * 1024 * 1024)
+    if args.command == 'csv':
+        if args.format == 'csv':
+            analysis.csv_file = args.output or analysis.csv_file
+            analysis.generate_csv()
+        else:
+            analysis.columnar_files[args.format] = args.output or analysis.columnar_files[args.format]
+            analysis.generate_columnar(args.format)
+    elif args.command == 'plot':
+        analysis.plot_file = args.output or analysis.plot_file
+        analysis.create_plot(args.mode, top_n=args.top_n, bins=args.bins)
+    elif args.command == 'summary':
+        summary = analysis.summary(args.top_n)
+        print(f"Rows: {summary['rows']}  Hosts: {summary['hosts']}  Malformed lines: {summary['malformed_lines']}")
+        print(f"Open ports: total {summary['total_open_ports']}, mean {summary['mean_open_ports']:.2f}, "
+              f"median {summary['median_open_ports']:g}, max {summary['max_open_ports']}")
+        for ip, count in summary['top_hosts']:
+            print(f'{ip:<15} {count}')
+        return
+    elif args.command == 'diff':
+        analysis.history_dir = args.history_dir
+        analysis.diff_file = args.output or analysis.diff_file
+        if list_scans(analysis.history_dir):
+            diff = analysis.diff_with_scan(args.against)
+            analysis.generate_diff_csv(diff)
+            print(', '.join(f'{status}: {count}' for status, count in diff['Status'].value_counts(sort=False).items()))
+        else:
+            print(f'No previous scan in {analysis.history_dir}; nothing to compare.')
+        if args.save:
+            print(f'Scan saved as {analysis.save_scan()}')
+    print('Analysis completed successfully.')
+
+
+if __name__ == '__main__':
+    try:
+        main()
     except Exception as e:
         print(f'An error occurred: {e}')
+        sys.exit(1)
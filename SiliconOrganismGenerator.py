@@ -1,116 +1,282 @@
-import sys
-import cv2
-import numpy as np
-import traceback
-from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout, QPushButton, QFileDialog
-from PyQt5.QtGui import QPixmap, QImage
-from PyQt5.QtCore import Qt
-
-class SiliconOrganismGenerator(QWidget):
-    def __init__(self):
-        super().__init__()
-        self.setWindowTitle("Silicon Organism Generator")
-        self.setGeometry(100, 100, 800, 600)
-
-        self.image_label = QLabel(self)
-        self.image_label.setAlignment(Qt.AlignCenter)
-
-        layout = QVBoxLayout()
-        layout.addWidget(self.image_label)
-
-        self.btn_select_image = QPushButton("Select Image", self)
-        self.btn_select_image.clicked.connect(self.select_image)
-        layout.addWidget(self.btn_select_image)
-
-        self.btn_gray_detection = QPushButton("Gray Detection", self)
-        self.btn_gray_detection.clicked.connect(self.gray_detection)
-        layout.addWidget(self.btn_gray_detection)
-
-        self.btn_edge_detection = QPushButton("Edge Detection", self)
-        self.btn_edge_detection.clicked.connect(self.edge_detection)
-        layout.addWidget(self.btn_edge_detection)
-
-        self.btn_rgb_processing = QPushButton("RGB Processing", self)
-        self.btn_rgb_processing.clicked.connect(self.rgb_processing)
-        layout.addWidget(self.btn_rgb_processing)
-
-        self.btn_reset_image = QPushButton("Reset Image", self)
-        self.btn_reset_image.clicked.connect(self.reset_image)
-        layout.addWidget(self.btn_reset_image)
-
-        self.setLayout(layout)
-        self.current_image = None
-        self.original_image = None
-
-    def select_image(self):
-        options = QFileDialog.Options()
-        options |= QFileDialog.DontUseNativeDialog
-        file_name, _ = QFileDialog.getOpenFileName(self, "Select Image File", "",
-                                                   "Image Files (*.png *.jpg *.jpeg *.bmp *.gif);;All Files (*)", options=options)
-        if file_name:
-            try:
-                self.current_image = cv2.imread(file_name)
-                self.original_image = self.current_image.copy()
-                self.display_image(self.current_image)
-            except Exception as e:
-                self.create_error_log(e)
-
-    def display_image(self, image):
-        if len(image.shape) == 2:  # 如果是灰度图像
-            q_image = QImage(image.data, image.shape[1], image.shape[0], QImage.Format_Grayscale8)
-        else:
-            h, w, ch = image.shape
-            bytes_per_line = ch * w
-            if ch == 3:
-                q_image = QImage(image.data, w, h, bytes_per_line, QImage.Format_BGR888)
-            elif ch == 4:
-                q_image = QImage(image.data, w, h, bytes_per_line, QImage.Format_RGBA8888)
-    
-        # 显示图像
-        pixmap = QPixmap.fromImage(q_image)
-        self.image_label.setPixmap(pixmap)
-
-    def gray_detection(self):
-        if self.current_image is None:
-            return
-
-        # 灰度处理
-        gray_image = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2GRAY)
-        self.display_image(gray_image)
-
-    def edge_detection(self):
-        if self.current_image is None:
-            return
-
-        # 边缘检测
-        gray_image = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2GRAY)
-        edges = cv2.Canny(gray_image, 100, 200)
-        self.display_image(edges)
-
-    def rgb_processing(self):
-        if self.current_image is None:
-            return
-
-        # RGB处理
-        rgb_image = cv2.cvtColor(self.current_image, cv2.COLOR_BGR2RGB)
-        self.display_image(rgb_image)
-
-    def reset_image(self):
-        if self.original_image is not None:
-            self.current_image = self.original_image.copy()
-            self.display_image(self.current_image)
-
-    def create_error_log(self, exception):
-        with open("error_log.txt", "a") as f:
-            f.write("Exception occurred:\n")
-            f.write(str(exception))
-            f.write("\n\n")
-        traceback.print_exc(file=open("error_log.txt", "a"))
-
-if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    window = SiliconOrganismGenerator()
-    window.show()
-    sys.exit(app.exec_())
-
+import sys
+import cv2
+import numpy as np
+import traceback
+from PyQt5.QtWidgets import QApplication, QWidget, QLabel, QVBoxLayout, QPushButton, QFileDialog, QSizePolicy
+from PyQt5.QtGui import QPixmap, QImage
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, pyqtSignal
+
+# 载入时先缩小到的代理图最大边长，窗口缩放时从代理图生成预览，不再缩放原图
+PROXY_MAX_SIZE = 2048
+# 各处理操作的默认参数
+OPERATION_PARAMS = {
+    'gray': (),
+    'edges': (100, 200),  # Canny的两个阈值
+    'rgb': ()
+}
+
+
+def apply_operation(image, operation, params=()):
+    """对图像执行一种处理操作，返回新图像（不修改输入）"""
+    if operation == 'gray':
+        # 灰度处理
+        return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if operation == 'edges':
+        # 边缘检测
+        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        return cv2.Canny(gray_image, *params)
+    if operation == 'rgb':
+        # RGB处理
+        return cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    raise ValueError(f'Unknown operation: {operation}')
+
+
+def make_preview(image, max_width, max_height):
+    """按比例缩小到不超过max_width x max_height的预览图，不放大"""
+    h, w = image.shape[:2]
+    scale = min(max_width / w, max_height / h, 1.0)
+    if scale >= 1.0:
+        return image
+    size = (max(1, int(w * scale)), max(1, int(h * scale)))
+    return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+
+class ProcessingSignals(QObject):
+    # (任务编号, 缓存键, 结果图像)
+    finished = pyqtSignal(int, object, object)
+    # (任务编号, 异常)
+    failed = pyqtSignal(int, object)
+
+
+class ProcessingTask(QRunnable):
+    """在线程池中执行一次处理；被取消的任务不再发出结果
+
+    save_path不为空时把结果写入该文件（用于全分辨率导出）。
+    """
+
+    def __init__(self, job_id, image, operation, params, signals, save_path=None):
+        super().__init__()
+        self.job_id = job_id
+        self.image = image
+        self.operation = operation
+        self.params = params
+        self.signals = signals
+        self.save_path = save_path
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        if self.cancelled:
+            return
+        try:
+            result = apply_operation(self.image, self.operation, self.params) if self.operation else self.image
+            if self.save_path and not cv2.imwrite(self.save_path, result):
+                raise IOError(f'Could not write image: {self.save_path}')
+        except Exception as e:
+            self.signals.failed.emit(self.job_id, e)
+            return
+        if not self.cancelled:
+            self.signals.finished.emit(self.job_id, (self.operation, self.params), result)
+
+
+class SiliconOrganismGenerator(QWidget):
+    def __init__(self):
+        super().__init__()
+        self.setWindowTitle("Silicon Organism Generator")
+        self.setGeometry(100, 100, 800, 600)
+
+        self.image_label = QLabel(self)
+        self.image_label.setAlignment(Qt.AlignCenter)
+        # 预览图按标签大小生成，不能反过来让图片撑大标签
+        self.image_label.setSizePolicy(QSizePolicy.Ignored, QSizePolicy.Ignored)
+        self.image_label.setMinimumSize(1, 1)
+
+        layout = QVBoxLayout()
+        layout.addWidget(self.image_label)
+
+        self.btn_select_image = QPushButton("Select Image", self)
+        self.btn_select_image.clicked.connect(self.select_image)
+        layout.addWidget(self.btn_select_image)
+
+        self.btn_gray_detection = QPushButton("Gray Detection", self)
+        self.btn_gray_detection.clicked.connect(self.gray_detection)
+        layout.addWidget(self.btn_gray_detection)
+
+        self.btn_edge_detection = QPushButton("Edge Detection", self)
+        self.btn_edge_detection.clicked.connect(self.edge_detection)
+        layout.addWidget(self.btn_edge_detection)
+
+        self.btn_rgb_processing = QPushButton("RGB Processing", self)
+        self.btn_rgb_processing.clicked.connect(self.rgb_processing)
+        layout.addWidget(self.btn_rgb_processing)
+
+        self.btn_reset_image = QPushButton("Reset Image", self)
+        self.btn_reset_image.clicked.connect(self.reset_image)
+        layout.addWidget(self.btn_reset_image)
+
+        self.btn_export_image = QPushButton("Export Image", self)
+        self.btn_export_image.clicked.connect(self.export_image)
+        layout.addWidget(self.btn_export_image)
+
+        self.setLayout(layout)
+        self.current_image = None
+        self.original_image = None
+
+        # 界面只处理和显示按标签大小缩小的预览图；全分辨率只在导出时处理
+        self.proxy_image = None
+        self.preview_image = None
+        self.preview_cache = {}  # (操作, 参数) -> 处理后的预览图
+        self.current_operation = None
+        self.current_params = ()
+
+        # 处理在线程池中进行；只有最新预览任务的结果会被显示，之前未完成的任务被取消。
+        # job_id为每个任务（含导出）分配唯一编号
+        self.thread_pool = QThreadPool(self)
+        self.processing_signals = ProcessingSignals()
+        self.processing_signals.finished.connect(self.on_processing_finished)
+        self.processing_signals.failed.connect(self.on_processing_failed)
+        self.job_id = 0
+        self.active_task = None
+        self.export_tasks = {}
+
+    def select_image(self):
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        file_name, _ = QFileDialog.getOpenFileName(self, "Select Image File", "",
+                                                   "Image Files (*.png *.jpg *.jpeg *.bmp *.gif);;All Files (*)", options=options)
+        if file_name:
+            try:
+                self.current_image = cv2.imread(file_name)
+                self.original_image = self.current_image.copy()
+                self.current_operation = None
+                self.current_params = ()
+                self.proxy_image = make_preview(self.current_image, PROXY_MAX_SIZE, PROXY_MAX_SIZE)
+                self.preview_image = None
+                self.update_preview()
+            except Exception as e:
+                self.create_error_log(e)
+
+    def update_preview(self):
+        """按当前标签大小重建预览图，清空预览缓存并重新显示当前视图；预览尺寸不变时什么都不做"""
+        if self.proxy_image is None:
+            return
+        size = self.image_label.size()
+        preview = make_preview(self.proxy_image, max(1, size.width()), max(1, size.height()))
+        if self.preview_image is not None and preview.shape == self.preview_image.shape:
+            return
+        self.preview_image = preview
+        self.preview_cache = {(None, ()): self.preview_image}
+        self.show_operation(self.current_operation, self.current_params)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.update_preview()
+
+    def show_operation(self, operation, params=()):
+        """显示预览图的处理结果：已缓存的直接显示，否则取消上一个任务并提交新任务"""
+        if self.preview_image is None:
+            return
+        self.current_operation = operation
+        self.current_params = params
+
+        self.job_id += 1
+        if self.active_task is not None:
+            # 尚未开始的任务直接从队列移除，正在运行的任务完成后丢弃结果
+            self.active_task.cancel()
+            self.thread_pool.tryTake(self.active_task)
+            self.active_task = None
+
+        cached = self.preview_cache.get((operation, params))
+        if cached is not None:
+            self.display_image(cached)
+            return
+        self.active_task = ProcessingTask(self.job_id, self.preview_image, operation, params,
+                                          self.processing_signals)
+        self.active_task.setAutoDelete(False)
+        self.thread_pool.start(self.active_task)
+
+    def on_processing_finished(self, job_id, key, result):
+        if job_id in self.export_tasks:
+            del self.export_tasks[job_id]
+            self.setWindowTitle("Silicon Organism Generator")
+            return
+        if self.active_task is None or job_id != self.active_task.job_id:
+            return  # 过期任务的结果
+        self.active_task = None
+        self.preview_cache[key] = result
+        self.display_image(result)
+
+    def on_processing_failed(self, job_id, exception):
+        if job_id in self.export_tasks:
+            del self.export_tasks[job_id]
+            self.setWindowTitle("Silicon Organism Generator")
+        elif self.active_task is not None and job_id == self.active_task.job_id:
+            self.active_task = None
+        self.create_error_log(exception)
+
+    def export_image(self):
+        """以全分辨率执行当前操作并保存，在后台线程中进行"""
+        if self.current_image is None:
+            return
+        options = QFileDialog.Options()
+        options |= QFileDialog.DontUseNativeDialog
+        file_name, _ = QFileDialog.getSaveFileName(self, "Export Image", "",
+                                                   "PNG (*.png);;JPEG (*.jpg *.jpeg);;BMP (*.bmp);;All Files (*)",
+                                                   options=options)
+        if not file_name:
+            return
+        self.job_id += 1
+        task = ProcessingTask(self.job_id, self.current_image, self.current_operation, self.current_params,
+                              self.processing_signals, save_path=file_name)
+        task.setAutoDelete(False)
+        self.export_tasks[self.job_id] = task
+        self.setWindowTitle("Silicon Organism Generator - Exporting...")
+        self.thread_pool.start(task)
+
+    def display_image(self, image):
+        image = np.ascontiguousarray(image)
+        if len(image.shape) == 2:  # 如果是灰度图像
+            # 预览图宽度任意，需显式给出每行字节数
+            q_image = QImage(image.data, image.shape[1], image.shape[0], image.shape[1], QImage.Format_Grayscale8)
+        else:
+            h, w, ch = image.shape
+            bytes_per_line = ch * w
+            if ch == 3:
+                q_image = QImage(image.data, w, h, bytes_per_line, QImage.Format_BGR888)
+            elif ch == 4:
+                q_image = QImage(image.data, w, h, bytes_per_line, QImage.Format_RGBA8888)
+    
+        # 显示图像
+        pixmap = QPixmap.fromImage(q_image)
+        self.image_label.setPixmap(pixmap)
+
+    def gray_detection(self):
+        self.show_operation('gray', OPERATION_PARAMS['gray'])
+
+    def edge_detection(self):
+        self.show_operation('edges', OPERATION_PARAMS['edges'])
+
+    def rgb_processing(self):
+        self.show_operation('rgb', OPERATION_PARAMS['rgb'])
+
+    def reset_image(self):
+        if self.original_image is not None:
+            self.current_image = self.original_image.copy()
+            self.show_operation(None)
+
+    def create_error_log(self, exception):
+        with open("error_log.txt", "a") as f:
+            f.write("Exception occurred:\n")
+            f.write(str(exception))
+            f.write("\n\n")
+        traceback.print_exc(file=open("error_log.txt", "a"))
+
+if __name__ == '__main__':
+    app = QApplication(sys.argv)
+    window = SiliconOrganismGenerator()
+    window.show()
+    sys.exit(app.exec_())
+
 #end of SiliconOrganismGenerator.py
\ No newline at end of file
@@ -1,7 +1,10 @@
 import tweepy
 import logging
 import pandas as pd
+import csv
 import os
+import time
+from collections import deque
 
 # 配置日志
 logging.basicConfig(
@@ -10,14 +13,130 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+# users/lookup每次最多100个用户名，用户认证下每15分钟最多900次
+LOOKUP_BATCH_SIZE = 100
+LOOKUP_WINDOW_CALLS = 900
+LOOKUP_WINDOW_SECONDS = 15 * 60
+USER_FIELDS = ['username', 'name', 'description', 'followers_count', 'following_count', 'location']
+# Parquet中为int64的字段，其余字段为字符串
+INTEGER_FIELDS = frozenset({'followers_count', 'following_count'})
+
+
+def user_to_dict(user):
+    return {
+        'username': user.screen_name,
+        'name': user.name,
+        'description': user.description,
+        'followers_count': user.followers_count,
+        'following_count': user.friends_count,
+        'location': user.location
+    }
+
+
+class RateLimitWindow:
+    """滑动窗口限速：任意period秒内最多calls次调用，超出时等待"""
+
+    def __init__(self, calls=LOOKUP_WINDOW_CALLS, period=LOOKUP_WINDOW_SECONDS):
+        self.calls = calls
+        self.period = period
+        self.timestamps = deque()
+
+    def wait(self):
+        now = time.monotonic()
+        while self.timestamps and now - self.timestamps[0] >= self.period:
+            self.timestamps.popleft()
+        if len(self.timestamps) >= self.calls:
+            delay = self.period - (now - self.timestamps[0])
+            logging.info(f'Rate limit window full, waiting {delay:.1f}s.')
+            time.sleep(delay)
+            self.timestamps.popleft()
+        self.timestamps.append(time.monotonic())
+
+
+class UserInfoWriter:
+    """缓冲写入用户信息，攒够buffer_rows行后整块写出；CSV表头只写一次，Parquet每块一个行组
+
+    CSV以追加方式写入，已有内容时不再写表头；Parquet文件每次打开都会重写。
+    """
+
+    def __init__(self, file_path, fmt='csv', buffer_rows=10000, fields=USER_FIELDS):
+        if fmt not in ('csv', 'parquet'):
+            raise ValueError(f'Unknown output format: {fmt}')
+        directory = os.path.dirname(file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.file_path = file_path
+        self.fmt = fmt
+        self.buffer_rows = buffer_rows
+        self.fields = fields
+        self.rows = []
+        self.rows_written = 0
+        self._file = None
+        self._writer = None
+
+    def write(self, row):
+        self.rows.append(row)
+        if len(self.rows) >= self.buffer_rows:
+            self.flush()
+
+    def write_many(self, rows):
+        for row in rows:
+            self.write(row)
+
+    def flush(self):
+        if not self.rows:
+            return
+        if self.fmt == 'csv':
+            if self._writer is None:
+                write_header = not os.path.isfile(self.file_path) or os.path.getsize(self.file_path) == 0
+                self._file = open(self.file_path, 'a', newline='', encoding='utf-8', buffering=1024 * 1024)
+                self._writer = csv.DictWriter(self._file, fieldnames=self.fields, extrasaction='ignore')
+                if write_header:
+                    self._writer.writeheader()
+            self._writer.writerows(self.rows)
+            self._file.flush()
+        else:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+            if self._writer is None:
+                # 显式指定schema：首块中整列为None时推断出的null类型会让后续块无法写入
+                schema = pa.schema([(field, pa.int64() if field in INTEGER_FIELDS else pa.string())
+                                    for field in self.fields])
+                self._writer = pq.ParquetWriter(self.file_path, schema)
+            self._writer.write_table(pa.Table.from_pylist(self.rows, schema=self._writer.schema))
+        self.rows_written += len(self.rows)
+        logging.info(f'Flushed {len(self.rows)} rows to {self.file_path} ({self.rows_written} total).')
+        self.rows = []
+
+    def close(self):
+        self.flush()
+        if self._file is not None:
+            self._file.close()
+        elif self._writer is not None:
+            self._writer.close()
+        self._file = self._writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
 class TwitterAPI:
-    def __init__(self):
+    def __init__(self, api=None):
         # 从环境变量中获取API凭证
         self.api_key = os.getenv('API_KEY')
         self.api_key_secret = os.getenv('API_KEY_SECRET')
         self.access_token = os.getenv('ACCESS_TOKEN')
         self.access_token_secret = os.getenv('ACCESS_TOKEN_SECRET')
         
+        self.lookup_window = RateLimitWindow()
+
+        # 传入api对象（例如测试用的模拟对象）时跳过认证
+        if api is not None:
+            self.api = api
+            return
         if not self.api_key or not self.api_key_secret or not self.access_token or not self.access_token_secret:
             raise ValueError("请确保所有API凭证都已设置在环境变量中。")
 
@@ -40,18 +159,52 @@ class TwitterAPI:
         try:
             user = self.api.get_user(screen_name=username)
             logging.info(f'User info retrieved for {username}')
-            return {
-                'username': user.screen_name,
-                'name': user.name,
-                'description': user.description,
-                'followers_count': user.followers_count,
-                'following_count': user.friends_count,
-                'location': user.location
-            }
+            return user_to_dict(user)
         except tweepy.TweepError as e:
             logging.error(f'Error retrieving user info: {e}')
             raise Exception(f'Error retrieving user info: {str(e)}')
 
+    def lookup_users_bulk(self, usernames, batch_size=LOOKUP_BATCH_SIZE, writer=None):
+        """按每批最多100个用户名批量查询，遵守限速窗口；返回({用户名: 用户信息}, [未找到的用户名])
+
+        传入UserInfoWriter时每批结果随即写入。用户名不区分大小写。
+        """
+        found = {}
+        missing = []
+        names = list(dict.fromkeys(usernames))
+        for start in range(0, len(names), min(batch_size, LOOKUP_BATCH_SIZE)):
+            batch = names[start:start + min(batch_size, LOOKUP_BATCH_SIZE)]
+            while True:
+                self.lookup_window.wait()
+                try:
+                    users = self.api.lookup_users(screen_names=batch)
+                    break
+                except tweepy.RateLimitError as e:
+                    # 服务端的窗口比本地计数先用完时，等到x-rate-limit-reset后重试本批
+                    reset = getattr(getattr(e, 'response', None), 'headers', {}).get('x-rate-limit-reset')
+                    delay = max(1.0, float(reset) - time.time()) if reset else LOOKUP_WINDOW_SECONDS
+                    logging.warning(f'Rate limited by Twitter, retrying batch in {delay:.0f}s.')
+                    time.sleep(delay)
+                except tweepy.TweepError as e:
+                    # 一批中没有任何有效用户名时接口返回404
+                    if getattr(e, 'api_code', None) == 17:
+                        users = []
+                        break
+                    logging.error(f'Error looking up users: {e}')
+                    raise Exception(f'Error looking up users: {str(e)}')
+
+            infos = {user.screen_name.lower(): user_to_dict(user) for user in users}
+            for name in batch:
+                info = infos.get(name.lower())
+                if info is None:
+                    missing.append(name)
+                else:
+                    found[name] = info
+                    if writer is not None:
+                        writer.write(info)
+        logging.info(f'Bulk lookup: {len(found)} found, {len(missing)} missing.')
+        return found, missing
+
     def save_to_csv(self, user_info, directory='data', filename='user_info.csv'):
         # 确保目录存在
         if not os.path.exists(directory):
@@ -1,5 +1,6 @@
 import requests
 import logging
+from APIClient import APIClient
 
 # 配置日志
 logging.basicConfig(
@@ -8,10 +9,11 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-class YouTubeAPI:
-    def __init__(self, api_key):
+class YouTubeAPI(APIClient):
+    def __init__(self, api_key, base_url='https://www.googleapis.com/youtube/v3/', **client_options):
+        # client_options传给APIClient：timeout、max_retries、pool_maxsize等
+        super().__init__(base_url, **client_options)
         self.api_key = api_key
-        self.base_url = 'https://www.googleapis.com/youtube/v3/'
 
     def get_user_info(self, channel_id):
         url = f'{self.base_url}channels'
@@ -22,7 +24,7 @@ class YouTubeAPI:
         }
 
         try:
-            response = requests.get(url, params=params)
+            response = self.get(url, params=params)
             response.raise_for_status()  # 抛出HTTPError异常
             user_info = response.json()
             logging.info('User info retrieved successfully.')
@@ -31,6 +33,74 @@ class YouTubeAPI:
             logging.error(f'Error retrieving user info: {e}')
             raise Exception(f'Error retrieving user info: {response.text}')
 
+    def get_users_info_batch(self, channel_ids, batch_size=50):
+        """批量获取频道信息，每次请求最多50个逗号分隔的ID，返回({频道ID: 频道信息}, {缺失的频道ID: 原因})"""
+        url = f'{self.base_url}channels'
+        found = {}
+        missing = {}
+        for batch in self.batches(channel_ids, min(batch_size, 50)):
+            params = {
+                'part': 'snippet,contentDetails',
+                'id': ','.join(batch),
+                'maxResults': len(batch),
+                'key': self.api_key
+            }
+            try:
+                response = self.get(url, params=params)
+                response.raise_for_status()  # 抛出HTTPError异常
+                items = {item['id']: item for item in response.json().get('items', [])}
+            except requests.exceptions.HTTPError as e:
+                logging.error(f'Error retrieving channel batch: {e}')
+                raise Exception(f'Error retrieving channel batch: {response.text}')
+            for channel_id in batch:
+                if channel_id in items:
+                    found[channel_id] = items[channel_id]
+                else:
+                    missing[channel_id] = 'not found'
+        logging.info(f'Channel batch lookup: {len(found)} found, {len(missing)} missing.')
+        return found, missing
+
+    def get_uploads_playlist_id(self, channel_id):
+        """返回频道上传列表的播放列表ID（contentDetails.relatedPlaylists.uploads）"""
+        channels = self.get_user_info(channel_id).get('items', [])
+        if not channels:
+            raise Exception(f'Channel not found: {channel_id}')
+        return channels[0]['contentDetails']['relatedPlaylists']['uploads']
+
+    def iter_playlist_items(self, playlist_id, part='snippet,contentDetails', page_size=50, prefetch=False):
+        """逐条产出播放列表中的条目，沿nextPageToken惰性翻页；prefetch为True时后台预取下一页"""
+        url = f'{self.base_url}playlistItems'
+
+        def fetch_page(page_token):
+            params = {
+                'part': part,
+                'playlistId': playlist_id,
+                'maxResults': min(page_size, 50),
+                'key': self.api_key
+            }
+            if page_token:
+                params['pageToken'] = page_token
+            try:
+                response = self.get(url, params=params)
+                response.raise_for_status()  # 抛出HTTPError异常
+                page = response.json()
+            except requests.exceptions.HTTPError as e:
+                logging.error(f'Error retrieving playlist items: {e}')
+                raise Exception(f'Error retrieving playlist items: {response.text}')
+            return page.get('items', []), page.get('nextPageToken')
+
+        return self.paginate(fetch_page, prefetch)
+
+    def iter_channel_uploads(self, channel_id, page_size=50, prefetch=False):
+        """逐条产出频道上传的视频（通过上传列表播放列表）"""
+        yield from self.iter_playlist_items(self.get_uploads_playlist_id(channel_id), page_size=page_size,
+                                            prefetch=prefetch)
+
+    async def get_user_infos(self, channel_ids, concurrency=10):
+        """并发获取多个频道ID对应的用户信息，按完成顺序异步产出(频道ID, 用户信息, 异常)"""
+        async for result in self.fetch_many(channel_ids, self.get_user_info, concurrency):
+            yield result
+
 # 使用示例
 if __name__ == '__main__':
     api_key = 'YOUR_API_KEY'  # 替换为你的API密钥
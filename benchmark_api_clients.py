@@ -0,0 +1,113 @@
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from FacebookAPI import FacebookAPI
+from InstagramAPI import InstagramAPI
+from YouTubeAPI import YouTubeAPI
+
+# Measures bulk-fetch throughput of the social API clients against a local
+# mock server that answers every GET after a fixed latency, optionally
+# failing a fraction of requests. One row per (provider, concurrency).
+
+PROVIDERS = {
+    'facebook': lambda base_url, **options: FacebookAPI('token', base_url=base_url, **options),
+    'instagram': lambda base_url, **options: InstagramAPI('token', base_url=base_url, **options),
+    'youtube': lambda base_url, **options: YouTubeAPI('key', base_url=base_url, **options)
+}
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Buffer headers and body into one write; separate small writes hit
+    # delayed ACKs and add ~40 ms to every keep-alive response.
+    wbufsize = 64 * 1024
+    latency = 0.05
+    error_rate = 0.0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        if random.random() < self.error_rate:
+            status, body = 404, b'{"error": {"message": "not found"}}'
+        else:
+            status, body = 200, json.dumps({'id': self.path, 'name': 'mock'}).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_mock_server(latency, error_rate):
+    handler = type('Handler', (MockHandler,), {'latency': latency, 'error_rate': error_rate})
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    # The default listen backlog (5) drops connections at high concurrency.
+    server.request_queue_size = 1024
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}/'
+
+
+async def bulk_fetch(client, count, concurrency):
+    ok = errors = 0
+    async for _, _, error in client.get_user_infos((f'id{i}' for i in range(count)), concurrency):
+        if error is None:
+            ok += 1
+        else:
+            errors += 1
+    return ok, errors
+
+
+def run_benchmark(provider, base_url, count, concurrency, rate_limit=None):
+    with PROVIDERS[provider](base_url, rate_limit=rate_limit, max_retries=0) as client:
+        start = time.perf_counter()
+        ok, errors = asyncio.run(bulk_fetch(client, count, concurrency))
+        elapsed = time.perf_counter() - start
+        stats = client.latency_summary()
+    return {
+        'provider': provider,
+        'concurrency': concurrency,
+        'items': count,
+        'ok': ok,
+        'errors': errors,
+        'seconds': round(elapsed, 3),
+        'items_per_sec': round(count / elapsed, 1) if elapsed > 0 else 0.0,
+        'mean_latency_ms': round(stats['latency_mean'] * 1000, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark concurrent bulk fetching against a local mock server.')
+    parser.add_argument('--provider', choices=sorted(PROVIDERS), default='youtube')
+    parser.add_argument('--count', type=int, default=500, help='Items fetched per run.')
+    parser.add_argument('--concurrency', default='1,4,16,64', help='Comma-separated concurrency levels.')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mock server latency in seconds.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of requests answered with 404.')
+    parser.add_argument('--rate-limit', type=float, help='Client token-bucket limit in requests per second.')
+    parser.add_argument('--url', help='Benchmark an already running server instead of the built-in mock.')
+    args = parser.parse_args()
+
+    server = None
+    base_url = args.url
+    if not base_url:
+        server, base_url = start_mock_server(args.latency, args.error_rate)
+    try:
+        for concurrency in (int(level) for level in args.concurrency.split(',')):
+            row = run_benchmark(args.provider, base_url, args.count, concurrency, args.rate_limit)
+            print(json.dumps(row))
+            sys.stdout.flush()
+    finally:
+        if server:
+            server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
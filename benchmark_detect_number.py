@@ -0,0 +1,214 @@
+import argparse
+import json
+import random
+import string
+import time
+
+import cv2
+import numpy as np
+
+from detect_number import LicensePlateRecognizer, box_iou
+
+
+def render_plate_image(text, width, height, rng):
+    """生成一张带噪声背景和车牌的合成图片，返回(图片, 车牌位置)"""
+    # 噪声背景
+    image = rng.normal(110, 40, (height, width, 3)).clip(0, 255).astype(np.uint8)
+    for _ in range(10):
+        pt1 = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        pt2 = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        color = tuple(int(c) for c in rng.integers(0, 255, 3))
+        cv2.line(image, pt1, pt2, color, int(rng.integers(1, 4)))
+
+    # 车牌区域，宽高比约为3.5
+    plate_w = int(width * rng.uniform(0.25, 0.4))
+    plate_h = int(plate_w / 3.5)
+    x = int(rng.integers(0, width - plate_w))
+    y = int(rng.integers(0, height - plate_h))
+    cv2.rectangle(image, (x, y), (x + plate_w, y + plate_h), (255, 255, 255), -1)
+    cv2.rectangle(image, (x, y), (x + plate_w, y + plate_h), (0, 0, 0), max(2, plate_h // 20))
+
+    # 按车牌大小缩放文字
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    thickness = max(1, plate_h // 15)
+    (text_w, text_h), _ = cv2.getTextSize(text, font, 1.0, thickness)
+    scale = min(plate_w * 0.85 / text_w, plate_h * 0.6 / text_h)
+    (text_w, text_h), _ = cv2.getTextSize(text, font, scale, thickness)
+    origin = (x + (plate_w - text_w) // 2, y + (plate_h + text_h) // 2)
+    cv2.putText(image, text, origin, font, scale, (0, 0, 0), thickness, cv2.LINE_AA)
+
+    return image, (x, y, plate_w, plate_h)
+
+
+def synthesize_records(count, sizes, seed=0):
+    """合成车牌记录，返回(数据库记录列表, 真实车牌位置字典)"""
+    rng = np.random.default_rng(seed)
+    text_rng = random.Random(seed)
+    records = []
+    truth = {}
+
+    for i in range(count):
+        width, height = sizes[i % len(sizes)]
+        text = ''.join(text_rng.choice(string.ascii_uppercase) for _ in range(3)) + \
+            ''.join(text_rng.choice(string.digits) for _ in range(4))
+        image, location = render_plate_image(text, width, height, rng)
+        _, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        records.append({'id': i + 1, 'plate_image': encoded.tobytes(), 'plate_number': text})
+        truth[i + 1] = location
+
+    return records, truth
+
+
+class InMemoryCursor:
+    """内存数据库游标，只支持识别器用到的几类SQL"""
+
+    def __init__(self, database, dictionary=False):
+        self.database = database
+        self.dictionary = dictionary
+        self.rows = []
+
+    def execute(self, query, params=()):
+        statement = query.strip()
+        if statement.startswith('SELECT'):
+            table = statement.split(' FROM ')[1].split()[0]
+            rows = self.database.tables.get(table, [])
+            if ' WHERE id > ' in statement:
+                rows = [row for row in rows if row['id'] > params[0]]
+            self.rows = rows[:params[-1]] if ' LIMIT ' in statement else list(rows)
+            if not self.dictionary:
+                self.rows = [tuple(row.values()) for row in self.rows]
+        elif statement.startswith('CREATE TABLE'):
+            table = statement.split('EXISTS')[1].split()[0]
+            self.database.tables.setdefault(table, [])
+        elif statement.startswith('INSERT'):
+            self.executemany(query, [params])
+        else:
+            raise NotImplementedError(statement.split()[0])
+
+    def executemany(self, query, seq_params):
+        statement = query.strip()
+        table = statement.split('INTO')[1].split()[0]
+        columns = [c.strip() for c in statement.split('(')[1].split(')')[0].split(',')]
+        self.database.tables.setdefault(table, []).extend(dict(zip(columns, params)) for params in seq_params)
+
+    def fetchall(self):
+        return self.rows
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def close(self):
+        pass
+
+
+class InMemoryConnection:
+    """内存数据库连接，用于替代MySQL进行离线基准测试"""
+
+    def __init__(self, database):
+        self.database = database
+
+    def is_connected(self):
+        return True
+
+    def cursor(self, dictionary=False, buffered=False):
+        return InMemoryCursor(self.database, dictionary)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class InMemoryDatabase:
+    """内存数据库，同时充当识别器的连接池"""
+
+    def __init__(self, records, table_name='license_plates'):
+        self.tables = {table_name: records}
+
+    def get_connection(self):
+        return InMemoryConnection(self)
+
+
+class DetectionOnlyRecognizer(LicensePlateRecognizer):
+    """跳过OCR的识别器，用于没有安装Tesseract的环境"""
+
+    def recognize_plate_text(self, plate_image):
+        return ''
+
+
+def run_benchmark(recognizer, records, truth, page_size=100, batch_size=500):
+    """在内存数据库上运行完整流程，返回吞吐量、准确率与各阶段耗时"""
+    database = InMemoryDatabase(records)
+    recognizer.pool = database
+    if recognizer.timer:
+        recognizer.timer.reset()
+
+    detected = 0
+
+    def results():
+        nonlocal detected
+        for result in recognizer.stream_images_from_database(page_size=page_size):
+            # 与真实位置的IoU不低于0.5视为检测正确
+            if 'plate_location' in result and box_iou(result['plate_location'], truth[result['id']]) >= 0.5:
+                detected += 1
+            yield result
+
+    start = time.perf_counter()
+    recognizer.write_results(database.get_connection(), results(), batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+
+    saved = database.tables['recognition_results']
+    matched = sum(1 for row in saved if row['is_correct'])
+
+    return {
+        'records': len(records),
+        'detection_max_width': recognizer.detection_max_width,
+        'seconds': elapsed,
+        'rows_per_sec': len(records) / elapsed if elapsed > 0 else 0.0,
+        'detection_rate': detected / max(1, len(records)),
+        'recognition_accuracy': matched / max(1, len(records)),
+        'stages': recognizer.timer.summary() if recognizer.timer else {}
+    }
+
+
+def parse_size(value):
+    width, height = value.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the license plate recognizer on synthetic images.')
+    parser.add_argument('--count', type=int, default=200, help='Number of synthetic images.')
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=[(640, 480), (1280, 720), (1920, 1080)],
+                        help='Image sizes as WIDTHxHEIGHT.')
+    parser.add_argument('--detection-max-width', type=int, default=None, help='Detect on frames downscaled to this width.')
+    parser.add_argument('--no-ocr', action='store_true', help='Skip Tesseract and only benchmark detection.')
+    parser.add_argument('--page-size', type=int, default=100, help='Rows read per page.')
+    parser.add_argument('--seed', type=int, default=0, help='Random seed for image synthesis.')
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    args = parser.parse_args()
+
+    records, truth = synthesize_records(args.count, args.sizes, args.seed)
+    recognizer_cls = DetectionOnlyRecognizer if args.no_ocr else LicensePlateRecognizer
+    recognizer = recognizer_cls({}, detection_max_width=args.detection_max_width, instrument=True)
+
+    report = run_benchmark(recognizer, records, truth, page_size=args.page_size)
+
+    print(f"\n{report['records']} 张图片 | 检测宽度 {report['detection_max_width'] or '原始'} | "
+          f"{report['rows_per_sec']:.1f} 条/秒 | "
+          f"检测率 {report['detection_rate']:.1%} | 识别准确率 {report['recognition_accuracy']:.1%}")
+    for name, stats in sorted(report['stages'].items(), key=lambda item: -item[1]['total_ms']):
+        print(f"{name:<14} 次数 {stats['count']:>6} | 平均 {stats['mean_ms']:8.3f} ms | "
+              f"p95 {stats['p95_ms']:8.3f} ms | 合计 {stats['total_ms']:10.1f} ms")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,251 @@
+import os
+import io
+import csv
+import sys
+import json
+import time
+import shutil
+import hashlib
+import tempfile
+import argparse
+import subprocess
+from datetime import datetime
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.backends import default_backend
+
+# Benchmarks encrypt/decrypt round trips through encrypt_decrypt_doc.py and
+# the CMake-built DocumentEncryption binary on synthetic documents. Every
+# measurement runs in a child process so peak RSS can be read per run with
+# os.wait4. Results are one row per (implementation, operation, size).
+
+FIELDS = ['timestamp', 'implementation', 'operation', 'size_bytes', 'repeat', 'status',
+          'mb_per_sec', 'peak_rss_kb', 'p50_ms', 'p95_ms', 'p99_ms', 'error']
+SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3}
+DOCUMENT_NAME = 'benchmark.docx'
+
+def parse_size(value):
+    value = value.strip().upper()
+    if value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+def write_synthetic_document(path, size, block_size=1024 * 1024):
+    # Random bytes, written in blocks so multi-GB documents need no memory.
+    with open(path, 'wb') as document:
+        remaining = size
+        while remaining > 0:
+            block = os.urandom(min(block_size, remaining))
+            document.write(block)
+            remaining -= len(block)
+
+def file_digest(path, block_size=1024 * 1024):
+    # (size, SHA-256) of a file, read in blocks like the synthetic writer.
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, 'rb') as document:
+        for block in iter(lambda: document.read(block_size), b''):
+            digest.update(block)
+            size += len(block)
+    return size, digest.hexdigest()
+
+def verify_output(operation, document_path, source_digest):
+    # A zero exit code is not enough: DocumentEncryption reports a bad key
+    # and still exits 0 without writing anything. Encrypting must leave an
+    # .encrypted file and decrypting must restore the source bytes.
+    if operation == 'encrypt':
+        if not os.path.isfile(document_path + '.encrypted'):
+            return 'no encrypted output written'
+        return ''
+    if not os.path.isfile(document_path):
+        return 'no decrypted output written'
+    if file_digest(document_path) != source_digest:
+        return 'decrypted output differs from source'
+    return ''
+
+def write_key_pair(directory):
+    # PKCS#1 PEM keys, readable by both the Python loader and the C++
+    # PEM_read_bio_RSAPublicKey/PEM_read_bio_RSAPrivateKey calls.
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048, backend=default_backend())
+    private_key_file = os.path.join(directory, 'private.pem')
+    public_key_file = os.path.join(directory, 'public.pem')
+    with open(private_key_file, 'wb') as key_file:
+        key_file.write(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            encryption_algorithm=serialization.NoEncryption()
+        ))
+    with open(public_key_file, 'wb') as key_file:
+        key_file.write(private_key.public_key().public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.PKCS1
+        ))
+    return private_key_file, public_key_file
+
+def percentile(values, q):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+def run_measured(command):
+    # Returns (exit code, stdout, stderr, peak RSS in KB) for one child
+    # process. Output goes to temporary files so the child can be reaped
+    # with os.wait4, which reports that child's own resource usage.
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        process = subprocess.Popen(command, stdout=stdout, stderr=stderr)
+        _, status, usage = os.wait4(process.pid, 0)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        stdout.seek(0)
+        stderr.seek(0)
+        return (process.returncode, stdout.read().decode(errors='replace'),
+                stderr.read().decode(errors='replace'), usage.ru_maxrss)
+
+def python_worker(operation, document_path, key_file, repeat):
+    # Runs inside the child process: times each call in-process so the
+    # latencies exclude interpreter start-up.
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import encrypt_decrypt_doc
+
+    log_file = io.StringIO()
+    latencies = []
+    if operation == 'encrypt':
+        key = encrypt_decrypt_doc.load_public_key(key_file)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            encrypt_decrypt_doc.encrypt_document(document_path, key, log_file)
+            latencies.append(time.perf_counter() - start)
+    else:
+        key = encrypt_decrypt_doc.load_key_from_file(key_file)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            encrypt_decrypt_doc.decrypt_document(document_path + '.encrypted', key, log_file)
+            latencies.append(time.perf_counter() - start)
+    print(json.dumps(latencies))
+
+def bench_python(operation, document_path, key_file, repeat):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', operation,
+               '--worker-document', document_path, '--worker-key', key_file, '--repeat', str(repeat)]
+    returncode, stdout, stderr, peak_rss = run_measured(command)
+    if returncode != 0:
+        return None, peak_rss, stderr.strip().splitlines()[-1] if stderr.strip() else f'exit {returncode}'
+    return json.loads(stdout.strip().splitlines()[-1]), peak_rss, ''
+
+def bench_cpp(binary, operation, document_path, key_file, repeat):
+    # The binary only processes whole directories, so each latency is the
+    # wall time of one process run on a directory holding one document.
+    directory = os.path.dirname(document_path)
+    latencies = []
+    peak_rss = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        returncode, _, stderr, rss = run_measured([binary, operation, directory, key_file, os.devnull])
+        latencies.append(time.perf_counter() - start)
+        peak_rss = max(peak_rss, rss)
+        if returncode != 0:
+            return None, peak_rss, stderr.strip().splitlines()[-1] if stderr.strip() else f'exit {returncode}'
+    return latencies, peak_rss, ''
+
+def find_cpp_binary(path=None):
+    candidates = [path] if path else [
+        shutil.which('DocumentEncryption'),
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), 'build', 'DocumentEncryption')
+    ]
+    for candidate in candidates:
+        if candidate and os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            return candidate
+    return None
+
+def run_benchmarks(sizes, repeat, cpp_binary=None, work_directory=None):
+    implementations = {'python': bench_python}
+    if cpp_binary:
+        implementations['cpp'] = lambda op, doc, key, n: bench_cpp(cpp_binary, op, doc, key, n)
+
+    timestamp = datetime.now().isoformat(timespec='seconds')
+    rows = []
+    root = tempfile.mkdtemp(prefix='doc-bench-', dir=work_directory)
+    try:
+        private_key_file, public_key_file = write_key_pair(root)
+        for size in sizes:
+            for name, bench in implementations.items():
+                directory = os.path.join(root, f'{name}-{size}')
+                os.makedirs(directory)
+                document_path = os.path.join(directory, DOCUMENT_NAME)
+                write_synthetic_document(document_path, size)
+                source_digest = file_digest(document_path)
+
+                for operation, key_file in (('encrypt', public_key_file), ('decrypt', private_key_file)):
+                    latencies, peak_rss, error = bench(operation, document_path, key_file, repeat)
+                    if latencies is not None:
+                        error = verify_output(operation, document_path, source_digest)
+                        if error:
+                            latencies = None
+                        elif operation == 'encrypt':
+                            # Remove the source so the round-trip check only
+                            # passes if decrypting actually recreates it.
+                            os.remove(document_path)
+                    row = {'timestamp': timestamp, 'implementation': name, 'operation': operation,
+                           'size_bytes': size, 'repeat': repeat, 'peak_rss_kb': peak_rss, 'error': error}
+                    if latencies is None:
+                        row.update(status='failed', mb_per_sec='', p50_ms='', p95_ms='', p99_ms='')
+                    else:
+                        p50 = percentile(latencies, 0.5)
+                        row.update(status='ok', mb_per_sec=round(size / p50 / 1e6, 2) if p50 > 0 else '',
+                                   p50_ms=round(p50 * 1000, 3),
+                                   p95_ms=round(percentile(latencies, 0.95) * 1000, 3),
+                                   p99_ms=round(percentile(latencies, 0.99) * 1000, 3))
+                    rows.append(row)
+                    print(f"{name:<7}{operation:<8}{size:>14} B  {row['status']:<7}"
+                          f"{row['mb_per_sec']!s:>10} MB/s  {peak_rss:>9} KB RSS  p50 {row['p50_ms']!s:>10} ms",
+                          file=sys.stderr)
+                    if latencies is None:
+                        # Decrypting needs the encrypted file from the step before.
+                        break
+
+                shutil.rmtree(directory)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return rows
+
+def write_rows(rows, output_path=None, output_format='csv'):
+    if output_format == 'json':
+        stream = open(output_path, 'a') if output_path else sys.stdout
+        for row in rows:
+            stream.write(json.dumps(row) + '\n')
+    else:
+        write_header = not output_path or not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        stream = open(output_path, 'a', newline='') if output_path else sys.stdout
+        writer = csv.DictWriter(stream, fieldnames=FIELDS)
+        if write_header:
+            writer.writeheader()
+        writer.writerows(rows)
+    if output_path:
+        stream.close()
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark document encryption implementations.')
+    parser.add_argument('--sizes', default='1K,64K,1M,16M,256M,1G',
+                        help='Comma-separated document sizes, e.g. 1K,1M,4G.')
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per size and operation.')
+    parser.add_argument('--cpp-binary', help='Path to the DocumentEncryption binary (default: PATH or ./build).')
+    parser.add_argument('--work-dir', help='Directory for temporary documents (default: system temp).')
+    parser.add_argument('--output', help='Append results to this file (default: stdout).')
+    parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='Output format.')
+    parser.add_argument('--worker', choices=['encrypt', 'decrypt'], help=argparse.SUPPRESS)
+    parser.add_argument('--worker-document', help=argparse.SUPPRESS)
+    parser.add_argument('--worker-key', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        python_worker(args.worker, args.worker_document, args.worker_key, args.repeat)
+        return
+
+    cpp_binary = find_cpp_binary(args.cpp_binary)
+    if not cpp_binary:
+        print('DocumentEncryption binary not found; benchmarking the Python implementation only.', file=sys.stderr)
+
+    sizes = [parse_size(size) for size in args.sizes.split(',')]
+    rows = run_benchmarks(sizes, args.repeat, cpp_binary, args.work_dir)
+    write_rows(rows, args.output, args.format)
+
+if __name__ == "__main__":
+    main()
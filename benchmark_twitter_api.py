@@ -0,0 +1,84 @@
+import os
+import json
+import time
+import shutil
+import tempfile
+import argparse
+from types import SimpleNamespace
+
+from TwitterAPI import TwitterAPI, UserInfoWriter, RateLimitWindow
+
+# Compares per-user get_user_info + save_to_csv against lookup_users_bulk
+# with a buffered writer, using an in-process mock of the tweepy API that
+# adds a fixed latency per call. Every tenth username does not exist.
+
+
+class MockTwitterAPI:
+    def __init__(self, latency=0.05):
+        self.latency = latency
+        self.calls = 0
+
+    def _user(self, screen_name):
+        return SimpleNamespace(screen_name=screen_name, name=f'User {screen_name}', description='mock account',
+                               followers_count=len(screen_name) * 100, friends_count=42, location='Nowhere')
+
+    def _exists(self, screen_name):
+        return not screen_name.endswith('9')
+
+    def get_user(self, screen_name):
+        self.calls += 1
+        time.sleep(self.latency)
+        return self._user(screen_name)
+
+    def lookup_users(self, screen_names):
+        self.calls += 1
+        time.sleep(self.latency)
+        return [self._user(name) for name in screen_names if self._exists(name)]
+
+
+def bench_single(usernames, latency, directory):
+    twitter = TwitterAPI(api=MockTwitterAPI(latency))
+    start = time.perf_counter()
+    for username in usernames:
+        twitter.save_to_csv(twitter.get_user_info(username), directory=directory, filename='single.csv')
+    return time.perf_counter() - start, twitter.api.calls
+
+
+def bench_bulk(usernames, latency, directory, fmt, window_calls, window_seconds):
+    twitter = TwitterAPI(api=MockTwitterAPI(latency))
+    twitter.lookup_window = RateLimitWindow(window_calls, window_seconds)
+    start = time.perf_counter()
+    with UserInfoWriter(os.path.join(directory, f'bulk.{fmt}'), fmt=fmt) as writer:
+        twitter.lookup_users_bulk(usernames, writer=writer)
+    return time.perf_counter() - start, twitter.api.calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark TwitterAPI bulk lookup against a mocked API.')
+    parser.add_argument('--count', type=int, default=2000, help='Usernames to resolve.')
+    parser.add_argument('--latency', type=float, default=0.05, help='Mock API latency per call in seconds.')
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv', help='Bulk writer format.')
+    parser.add_argument('--window-calls', type=int, default=900, help='Lookup calls allowed per window.')
+    parser.add_argument('--window-seconds', type=float, default=900, help='Rate-limit window length.')
+    parser.add_argument('--skip-single', action='store_true', help='Only run the bulk path.')
+    args = parser.parse_args()
+
+    usernames = [f'user{i}' for i in range(args.count)]
+    directory = tempfile.mkdtemp(prefix='twitter-bench-')
+    try:
+        modes = [('bulk', usernames, lambda: bench_bulk(usernames, args.latency, directory, args.format,
+                                                       args.window_calls, args.window_seconds))]
+        if not args.skip_single:
+            # The old path fails on missing users, so it only gets existing ones.
+            existing = [name for name in usernames if not name.endswith('9')]
+            modes.insert(0, ('single', existing, lambda: bench_single(existing, args.latency, directory)))
+        for mode, names, bench in modes:
+            seconds, calls = bench()
+            print(json.dumps({'mode': mode, 'users': len(names), 'api_calls': calls, 'seconds': round(seconds, 3),
+                              'users_per_sec': round(len(names) / seconds, 1) if seconds > 0 else 0.0}))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,208 @@
 import cv2
 import pytesseract
 import numpy as np
-import mysql.connector
-from mysql.connector import Error
+from mysql.connector import Error, pooling
 from PIL import Image
 import io
+import bisect
+import hashlib
+import json
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
 
 # 配置 Tesseract 可执行文件路径（如果需要）
 # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
 
+# 车牌允许出现的字符
+PLATE_CHAR_WHITELIST = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
+
+# 未开启计时时使用的空上下文
+_NO_TIMING = nullcontext()
+
+
+class StageTimer:
+    """按处理阶段记录耗时直方图（毫秒）"""
+    
+    # 直方图各桶的上界（毫秒），超过最后一个上界的计入溢出桶
+    BUCKET_BOUNDS_MS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+    
+    def __init__(self):
+        self.stages = {}
+    
+    @contextmanager
+    def stage(self, name):
+        """统计with代码块的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - start) * 1000)
+    
+    def record(self, name, elapsed_ms):
+        """记录一次阶段耗时"""
+        stats = self.stages.get(name)
+        if stats is None:
+            stats = self.stages[name] = {
+                'count': 0,
+                'total_ms': 0.0,
+                'min_ms': elapsed_ms,
+                'max_ms': elapsed_ms,
+                'buckets': [0] * (len(self.BUCKET_BOUNDS_MS) + 1)
+            }
+        stats['count'] += 1
+        stats['total_ms'] += elapsed_ms
+        stats['min_ms'] = min(stats['min_ms'], elapsed_ms)
+        stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+        stats['buckets'][bisect.bisect_left(self.BUCKET_BOUNDS_MS, elapsed_ms)] += 1
+    
+    def percentile(self, name, q):
+        """根据直方图估算分位数（返回所在桶的上界）"""
+        stats = self.stages[name]
+        target = q * stats['count']
+        seen = 0
+        for bound, bucket_count in zip(self.BUCKET_BOUNDS_MS, stats['buckets']):
+            seen += bucket_count
+            if seen >= target:
+                return min(bound, stats['max_ms'])
+        return stats['max_ms']
+    
+    def summary(self):
+        """返回可序列化为JSON的各阶段统计"""
+        labels = [f"<={bound}ms" for bound in self.BUCKET_BOUNDS_MS] + [f">{self.BUCKET_BOUNDS_MS[-1]}ms"]
+        return {
+            name: {
+                'count': stats['count'],
+                'total_ms': stats['total_ms'],
+                'mean_ms': stats['total_ms'] / stats['count'],
+                'min_ms': stats['min_ms'],
+                'max_ms': stats['max_ms'],
+                'p50_ms': self.percentile(name, 0.5),
+                'p95_ms': self.percentile(name, 0.95),
+                'p99_ms': self.percentile(name, 0.99),
+                'histogram': dict(zip(labels, stats['buckets']))
+            }
+            for name, stats in self.stages.items()
+        }
+    
+    def export_json(self, path):
+        """将各阶段统计导出为JSON文件"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.summary(), f, ensure_ascii=False, indent=2)
+    
+    def reset(self):
+        """清空已记录的统计"""
+        self.stages.clear()
+
+
+class PlateTracker:
+    """基于IoU匹配的轻量级车牌跟踪器"""
+    
+    def __init__(self, iou_threshold=0.3, max_age=15):
+        self.iou_threshold = iou_threshold
+        # 轨迹连续max_age帧未匹配到车牌后结束
+        self.max_age = max_age
+        self.next_track_id = 1
+        self.active_tracks = []
+        self.finished_tracks = []
+    
+    def update(self, boxes, frame_index):
+        """用当前帧检测到的车牌框更新轨迹，返回[(轨迹, 车牌框)]"""
+        # 按IoU从高到低贪心匹配
+        candidates = sorted(
+            ((box_iou(track['box'], box), t, b)
+             for t, track in enumerate(self.active_tracks)
+             for b, box in enumerate(boxes)),
+            reverse=True
+        )
+        matched_tracks = set()
+        matched_boxes = set()
+        matches = []
+        for iou, t, b in candidates:
+            if iou < self.iou_threshold:
+                break
+            if t in matched_tracks or b in matched_boxes:
+                continue
+            matched_tracks.add(t)
+            matched_boxes.add(b)
+            matches.append((self.active_tracks[t], boxes[b]))
+        
+        for b, box in enumerate(boxes):
+            if b not in matched_boxes:
+                track = {
+                    'track_id': self.next_track_id,
+                    'box': box,
+                    'first_frame': frame_index,
+                    'last_frame': frame_index,
+                    'frames_seen': 0,
+                    'best_quality': 0.0,
+                    'recognized_plate': None,
+                    'ocr_runs': 0
+                }
+                self.next_track_id += 1
+                self.active_tracks.append(track)
+                matches.append((track, box))
+        
+        for track, box in matches:
+            track['box'] = box
+            track['last_frame'] = frame_index
+            track['frames_seen'] += 1
+        
+        # 结束长时间未出现的轨迹
+        still_active = []
+        for track in self.active_tracks:
+            if frame_index - track['last_frame'] > self.max_age:
+                self.finished_tracks.append(track)
+            else:
+                still_active.append(track)
+        self.active_tracks = still_active
+        
+        return matches
+    
+    def all_tracks(self):
+        """返回全部轨迹（已结束的在前）"""
+        return self.finished_tracks + self.active_tracks
+
+
 class LicensePlateRecognizer:
-    def __init__(self, db_config):
+    def __init__(self, db_config, pool_size=4, detection_max_width=None, instrument=False):
         """初始化数据库连接"""
         self.db_config = db_config
+        self.pool_size = pool_size
+        # 检测时图像的最大宽度，None表示在原始分辨率上检测
+        self.detection_max_width = detection_max_width
+        # 分阶段计时（可选，多进程模式下只统计主进程中的阶段）
+        self.timer = StageTimer() if instrument else None
+        self.pool = None
         self.connection = None
+        # 已确认存在的结果表，避免每次保存都执行CREATE TABLE
+        self.created_tables = set()
+    
+    def __getstate__(self):
+        """序列化到工作进程时不携带数据库连接"""
+        state = self.__dict__.copy()
+        state['pool'] = None
+        state['connection'] = None
+        return state
+    
+    def get_connection_pool(self):
+        """获取连接池（首次使用时创建）"""
+        if self.pool is None:
+            self.pool = pooling.MySQLConnectionPool(
+                pool_name='license_plate_pool',
+                pool_size=self.pool_size,
+                **self.db_config
+            )
+        return self.pool
         
     def connect_to_database(self):
-        """建立数据库连接"""
+        """从连接池获取数据库连接"""
         try:
-            self.connection = mysql.connector.connect(**self.db_config)
+            self.connection = self.get_connection_pool().get_connection()
             if self.connection.is_connected():
                 print("成功连接到数据库")
                 return True
@@ -27,11 +211,15 @@ class LicensePlateRecognizer:
             return False
     
     def disconnect_from_database(self):
-        """关闭数据库连接"""
+        """关闭数据库连接（连接池中的连接会被归还）"""
         if self.connection and self.connection.is_connected():
             self.connection.close()
             print("数据库连接已关闭")
     
+    def stage(self, name):
+        """返回阶段计时上下文，未开启计时时为空操作"""
+        return self.timer.stage(name) if self.timer else _NO_TIMING
+    
     def preprocess_image(self, image):
         """图像预处理"""
         # 转换为灰度图
@@ -48,27 +236,32 @@ class LicensePlateRecognizer:
     def detect_license_plate(self, image):
         """检测车牌位置"""
         # 预处理图像
-        processed = self.preprocess_image(image)
+        with self.stage('preprocess'):
+            processed = self.preprocess_image(image)
         
         # 使用边缘检测
-        edges = cv2.Canny(processed, 50, 150)
+        with self.stage('canny'):
+            edges = cv2.Canny(processed, 50, 150)
         
         # 查找轮廓
-        contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
+        with self.stage('find_contours'):
+            contours, _ = cv2.findContours(edges, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
         
         # 按面积排序轮廓
-        contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
+        with self.stage('sort_contours'):
+            contours = sorted(contours, key=cv2.contourArea, reverse=True)[:10]
         
         # 寻找可能的车牌轮廓
         plate_contour = None
-        for contour in contours:
-            perimeter = cv2.arcLength(contour, True)
-            approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
-            
-            # 车牌通常是四边形
-            if len(approx) == 4:
-                plate_contour = approx
-                break
+        with self.stage('approx_poly'):
+            for contour in contours:
+                perimeter = cv2.arcLength(contour, True)
+                approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+                
+                # 车牌通常是四边形
+                if len(approx) == 4:
+                    plate_contour = approx
+                    break
         
         if plate_contour is not None:
             # 获取车牌区域
@@ -81,93 +274,460 @@ class LicensePlateRecognizer:
         
         return None
     
+    def detect_license_plates(self, image, max_plates=5, min_area=400, min_fill=0.5,
+                              min_aspect=2.5, max_aspect=5.0, ideal_aspect=3.5):
+        """检测图像中所有可能的车牌，按评分从高到低返回车牌位置列表
+        
+        所有轮廓的外接矩形和面积一次性计算为NumPy数组，先用向量化条件过滤，
+        只对通过过滤的候选框做多边形拟合，耗时与候选数量而不是轮廓数量相关。
+        """
+        with self.stage('preprocess'):
+            processed = self.preprocess_image(image)
+        
+        with self.stage('canny'):
+            edges = cv2.Canny(processed, 50, 150)
+        
+        # 只需要轮廓本身，不需要层级关系
+        with self.stage('find_contours'):
+            contours, _ = cv2.findContours(edges, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+        
+        if not contours:
+            return []
+        
+        with self.stage('candidate_filter'):
+            # 将所有轮廓点拼接，按轮廓分段计算外接矩形与面积
+            lengths = np.fromiter((len(c) for c in contours), dtype=np.intp, count=len(contours))
+            points = np.concatenate(contours).reshape(-1, 2).astype(np.int64)
+            starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+            
+            mins = np.minimum.reduceat(points, starts, axis=0)
+            maxs = np.maximum.reduceat(points, starts, axis=0)
+            widths = maxs[:, 0] - mins[:, 0] + 1
+            heights = maxs[:, 1] - mins[:, 1] + 1
+            
+            # 鞋带公式计算每个轮廓的面积，每段最后一个点与该段第一个点相连
+            next_index = np.arange(1, len(points) + 1)
+            next_index[starts + lengths - 1] = starts
+            cross = points[:, 0] * points[next_index, 1] - points[next_index, 0] * points[:, 1]
+            areas = np.abs(np.add.reduceat(cross, starts)) / 2.0
+            
+            aspects = widths / heights
+            fills = areas / (widths * heights)
+            mask = (
+                (areas >= min_area)
+                & (aspects > min_aspect) & (aspects < max_aspect)
+                & (fills >= min_fill)
+            )
+            candidates = np.flatnonzero(mask)
+            
+            # 评分：越接近矩形、宽高比越接近典型车牌越高
+            scores = fills[candidates] * np.exp(-np.abs(np.log(aspects[candidates] / ideal_aspect)))
+            candidates = candidates[np.argsort(-scores, kind='stable')]
+            scores = np.sort(scores)[::-1]
+        
+        plates = []
+        with self.stage('approx_poly'):
+            for index, score in zip(candidates, scores):
+                contour = contours[index]
+                perimeter = cv2.arcLength(contour, True)
+                approx = cv2.approxPolyDP(contour, 0.02 * perimeter, True)
+                
+                # 车牌通常是四边形
+                if len(approx) != 4:
+                    continue
+                
+                box = (int(mins[index, 0]), int(mins[index, 1]), int(widths[index]), int(heights[index]))
+                # 同一块车牌的内外边框只保留评分最高的一个
+                if any(box_iou(box, kept) > 0.5 for kept in plates):
+                    continue
+                
+                plates.append(box)
+                if len(plates) >= max_plates:
+                    break
+        
+        return plates
+    
+    def scale_for_detection(self, image, max_width):
+        """返回用于检测的缩小图像及缩放比例，图像不超过max_width时原样返回"""
+        height, width = image.shape[:2]
+        if width <= max_width:
+            return image, 1.0
+        
+        scale = max_width / width
+        small = cv2.resize(image, (max_width, max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+        return small, scale
+    
+    def map_box_to_image(self, box, scale, image):
+        """将缩小图像上的车牌位置映射回原始分辨率"""
+        if scale == 1.0:
+            return box
+        
+        height, width = image.shape[:2]
+        x, y, w, h = (round(v / scale) for v in box)
+        x, y = min(x, width - 1), min(y, height - 1)
+        return (x, y, min(w, width - x), min(h, height - y))
+    
+    def detect_license_plate_scaled(self, image, max_width=640):
+        """在缩小的图像上检测车牌，并将位置映射回原始分辨率"""
+        small, scale = self.scale_for_detection(image, max_width)
+        location = self.detect_license_plate(small)
+        if location is None:
+            return None
+        return self.map_box_to_image(location, scale, image)
+    
+    def locate_plate(self, image):
+        """根据配置选择原始分辨率或缩小后的检测路径"""
+        if self.detection_max_width:
+            return self.detect_license_plate_scaled(image, self.detection_max_width)
+        return self.detect_license_plate(image)
+    
+    def locate_plates(self, image, max_plates=5):
+        """检测所有车牌，按配置在缩小后的图像上检测"""
+        if not self.detection_max_width:
+            return self.detect_license_plates(image, max_plates)
+        
+        small, scale = self.scale_for_detection(image, self.detection_max_width)
+        # 面积阈值随缩放比例调整
+        min_area = max(1, round(400 * scale * scale))
+        return [self.map_box_to_image(box, scale, image)
+                for box in self.detect_license_plates(small, max_plates, min_area=min_area)]
+    
+    def binarize_plate(self, plate_image):
+        """车牌图像灰度化并二值化"""
+        gray_plate = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        _, binary_plate = cv2.threshold(gray_plate, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        return binary_plate
+    
     def recognize_plate_text(self, plate_image):
         """识别车牌文字"""
         # 进一步处理车牌图像
-        gray_plate = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
-        _, binary_plate = cv2.threshold(gray_plate, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+        binary_plate = self.binarize_plate(plate_image)
         
         # 使用Tesseract OCR识别
-        custom_config = r'--oem 3 --psm 7 -c tessedit_char_whitelist=ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        text = pytesseract.image_to_string(binary_plate, config=custom_config)
+        custom_config = rf'--oem 3 --psm 7 -c tessedit_char_whitelist={PLATE_CHAR_WHITELIST}'
+        with self.stage('ocr'):
+            text = pytesseract.image_to_string(binary_plate, config=custom_config)
         
         # 清理识别结果
         cleaned_text = ''.join(e for e in text if e.isalnum())
         return cleaned_text
     
-    def process_images_from_database(self, table_name='license_plates'):
-        """从数据库读取并处理车牌图片"""
-        if not self.connect_to_database():
-            return []
+    def recognize_plate_texts(self, plate_images, batch_size=32, line_height=64, line_gap=24):
+        """批量识别车牌文字，按输入顺序返回结果
         
-        try:
-            cursor = self.connection.cursor(dictionary=True)
+        将多张车牌拼接成一张长图，只调用一次Tesseract，再按每个单词的纵坐标
+        把识别结果分配回对应的车牌。
+        """
+        if len(plate_images) <= 1:
+            return [self.recognize_plate_text(plate) for plate in plate_images]
+        
+        texts = []
+        for offset in range(0, len(plate_images), batch_size):
+            batch = plate_images[offset:offset + batch_size]
+            try:
+                texts.extend(self._recognize_stacked(batch, line_height, line_gap))
+            except pytesseract.TesseractError as e:
+                # 批量识别失败时退回逐张识别
+                print(f"批量识别失败，改为逐张识别: {e}")
+                texts.extend(self.recognize_plate_text(plate) for plate in batch)
+        return texts
+    
+    def _recognize_stacked(self, plate_images, line_height, line_gap):
+        """将车牌拼接为一张图片后识别，返回每张车牌的文字"""
+        lines = []
+        for plate in plate_images:
+            binary_plate = self.binarize_plate(plate)
+            h, w = binary_plate.shape
+            width = max(1, round(w * line_height / h))
+            lines.append(cv2.resize(binary_plate, (width, line_height), interpolation=cv2.INTER_CUBIC))
+        
+        # 每行占用固定高度，行间留白便于Tesseract分行
+        band_height = line_height + line_gap
+        max_width = max(line.shape[1] for line in lines) + 2 * line_gap
+        stacked = np.full((band_height * len(lines) + line_gap, max_width), 255, dtype=np.uint8)
+        for i, line in enumerate(lines):
+            top = line_gap + i * band_height
+            stacked[top:top + line_height, line_gap:line_gap + line.shape[1]] = line
+        
+        custom_config = rf'--oem 3 --psm 6 -c tessedit_char_whitelist={PLATE_CHAR_WHITELIST}'
+        with self.stage('ocr_batch'):
+            data = pytesseract.image_to_data(stacked, config=custom_config, output_type=pytesseract.Output.DICT)
+        
+        words = [[] for _ in plate_images]
+        for text, left, top, height in zip(data['text'], data['left'], data['top'], data['height']):
+            if not text.strip():
+                continue
+            index = (top + height // 2 - line_gap // 2) // band_height
+            if 0 <= index < len(words):
+                words[index].append((left, text))
+        
+        return [''.join(e for _, text in sorted(line_words) for e in text if e.isalnum())
+                for line_words in words]
+    
+    def benchmark_ocr(self, plate_images, batch_size=32):
+        """对比逐张识别与批量识别的吞吐量（张/秒）"""
+        start = time.perf_counter()
+        single_texts = [self.recognize_plate_text(plate) for plate in plate_images]
+        single_elapsed = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        batch_texts = self.recognize_plate_texts(plate_images, batch_size)
+        batch_elapsed = time.perf_counter() - start
+        
+        stats = {
+            'plates': len(plate_images),
+            'single_plates_per_sec': len(plate_images) / single_elapsed if single_elapsed > 0 else 0.0,
+            'batch_plates_per_sec': len(plate_images) / batch_elapsed if batch_elapsed > 0 else 0.0,
+            'agreement': sum(a == b for a, b in zip(single_texts, batch_texts)) / max(1, len(plate_images))
+        }
+        print(f"逐张识别: {stats['single_plates_per_sec']:.1f} 张/秒 | "
+              f"批量识别: {stats['batch_plates_per_sec']:.1f} 张/秒 | "
+              f"结果一致率: {stats['agreement']:.1%}")
+        return stats
+    
+    def decode_image(self, image_data):
+        """将数据库中的二进制数据转换为OpenCV图像格式"""
+        # 直接在BLOB缓冲区上解码为BGR图像，避免PIL和颜色转换的额外拷贝；
+        # 与PIL路径一样忽略EXIF方向标记，保证图片尺寸和车牌坐标含义不变
+        with self.stage('decode'):
+            opencv_image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8),
+                                        cv2.IMREAD_COLOR | cv2.IMREAD_IGNORE_ORIENTATION)
+        if opencv_image is not None:
+            return opencv_image
+        
+        # OpenCV不支持的格式（如GIF）退回PIL解码
+        return self.decode_image_pil(image_data)
+    
+    def decode_image_pil(self, image_data):
+        """使用PIL将二进制数据转换为OpenCV图像格式"""
+        image = Image.open(io.BytesIO(image_data)).convert('RGB')
+        return cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    
+    def compare_detection_paths(self, records, max_width=640):
+        """对比快速路径（直接解码+缩小检测）与原路径的检测结果一致性"""
+        agreed = 0
+        ious = []
+        fast_elapsed = 0.0
+        full_elapsed = 0.0
+        
+        for record in records:
+            start = time.perf_counter()
+            full_location = self.detect_license_plate(self.decode_image_pil(record['plate_image']))
+            full_elapsed += time.perf_counter() - start
             
-            # 查询数据库获取车牌图片和相关信息
-            query = f"SELECT id, plate_image, plate_number FROM {table_name}"
-            cursor.execute(query)
+            start = time.perf_counter()
+            fast_location = self.detect_license_plate_scaled(self.decode_image(record['plate_image']), max_width)
+            fast_elapsed += time.perf_counter() - start
             
-            results = []
+            if full_location is None or fast_location is None:
+                agreed += full_location is None and fast_location is None
+                continue
+            
+            iou = box_iou(full_location, fast_location)
+            ious.append(iou)
+            agreed += iou >= 0.5
+        
+        stats = {
+            'records': len(records),
+            'agreement': agreed / max(1, len(records)),
+            'mean_iou': sum(ious) / len(ious) if ious else 0.0,
+            'full_seconds': full_elapsed,
+            'fast_seconds': fast_elapsed
+        }
+        print(f"检测一致率: {stats['agreement']:.1%} | 平均IoU: {stats['mean_iou']:.3f} | "
+              f"原路径 {full_elapsed:.2f} 秒 | 快速路径 {fast_elapsed:.2f} 秒")
+        return stats
+    
+    def analyze_image(self, image_data):
+        """解码并识别单张图片，返回(图像尺寸, 车牌位置, 识别文字)"""
+        # 将二进制数据转换为OpenCV图像格式
+        opencv_image = self.decode_image(image_data)
+        
+        # 检测车牌位置
+        plate_location = self.locate_plate(opencv_image)
+        
+        recognized_text = None
+        if plate_location:
+            x, y, w, h = plate_location
+            plate_img = opencv_image[y:y+h, x:x+w]
             
-            for record in cursor:
+            # 识别车牌文字
+            recognized_text = self.recognize_plate_text(plate_img)
+        
+        return opencv_image.shape, plate_location, recognized_text
+    
+    def analyze_records(self, records, batch_size=32):
+        """批量分析多条记录，车牌文字通过批量OCR识别，出错的记录对应None"""
+        analyses = [None] * len(records)
+        crops = []
+        crop_indices = []
+        
+        for i, record in enumerate(records):
+            try:
+                opencv_image = self.decode_image(record['plate_image'])
+                plate_location = self.locate_plate(opencv_image)
+                analyses[i] = (opencv_image.shape, plate_location, None)
+                if plate_location:
+                    x, y, w, h = plate_location
+                    crops.append(opencv_image[y:y+h, x:x+w])
+                    crop_indices.append(i)
+            except Exception as e:
+                print(f"处理记录ID {record.get('id', 'unknown')} 时出错: {e}")
+        
+        for i, text in zip(crop_indices, self.recognize_plate_texts(crops, batch_size)):
+            image_size, plate_location, _ = analyses[i]
+            analyses[i] = (image_size, plate_location, text)
+        
+        return analyses
+    
+    def build_result(self, record, image_size, plate_location, recognized_text):
+        """根据识别结果构建结果字典"""
+        if plate_location:
+            # 获取实际车牌号（如果有）
+            actual_text = record.get('plate_number', 'N/A')
+            
+            return {
+                'id': record['id'],
+                'actual_plate': actual_text,
+                'recognized_plate': recognized_text,
+                'match': actual_text.upper() == recognized_text.upper(),
+                'image_size': image_size,
+                'plate_location': plate_location
+            }
+        
+        return {
+            'id': record['id'],
+            'status': 'No plate detected',
+            'image_size': image_size
+        }
+    
+    def process_record(self, record):
+        """处理单条数据库记录，出错时返回None"""
+        try:
+            return self.build_result(record, *self.analyze_image(record['plate_image']))
+        except Exception as e:
+            print(f"处理记录ID {record.get('id', 'unknown')} 时出错: {e}")
+            return None
+    
+    def iter_record_pages(self, connection, table_name='license_plates', page_size=500, start_after=None):
+        """按ID分页读取车牌记录，每次生成一页，内存中最多只保留一页数据"""
+        last_id = start_after
+        while True:
+            with self.stage('db_read'):
+                cursor = connection.cursor(dictionary=True, buffered=True)
                 try:
-                    # 从数据库读取图片数据
-                    image_data = record['plate_image']
-                    
-                    # 将二进制数据转换为OpenCV图像格式
-                    image = Image.open(io.BytesIO(image_data))
-                    opencv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
-                    
-                    # 检测车牌位置
-                    plate_location = self.detect_license_plate(opencv_image)
-                    
-                    if plate_location:
-                        x, y, w, h = plate_location
-                        plate_img = opencv_image[y:y+h, x:x+w]
-                        
-                        # 识别车牌文字
-                        recognized_text = self.recognize_plate_text(plate_img)
-                        
-                        # 获取实际车牌号（如果有）
-                        actual_text = record.get('plate_number', 'N/A')
-                        
-                        # 保存结果
-                        result = {
-                            'id': record['id'],
-                            'actual_plate': actual_text,
-                            'recognized_plate': recognized_text,
-                            'match': actual_text.upper() == recognized_text.upper(),
-                            'image_size': opencv_image.shape,
-                            'plate_location': plate_location
-                        }
-                        
-                        results.append(result)
+                    # 基于ID范围分页，避免OFFSET随页数增大而变慢
+                    if last_id is None:
+                        query = f"SELECT id, plate_image, plate_number FROM {table_name} ORDER BY id LIMIT %s"
+                        cursor.execute(query, (page_size,))
                     else:
-                        results.append({
-                            'id': record['id'],
-                            'status': 'No plate detected',
-                            'image_size': opencv_image.shape
-                        })
-                
-                except Exception as e:
-                    print(f"处理记录ID {record.get('id', 'unknown')} 时出错: {e}")
-                    continue
+                        query = f"SELECT id, plate_image, plate_number FROM {table_name} WHERE id > %s ORDER BY id LIMIT %s"
+                        cursor.execute(query, (last_id, page_size))
+                    page = cursor.fetchall()
+                finally:
+                    cursor.close()
             
-            return results
+            if page:
+                last_id = page[-1]['id']
+                yield page
+            
+            if len(page) < page_size:
+                return
+    
+    def iter_records(self, connection, table_name='license_plates', page_size=500, start_after=None):
+        """按ID分页逐条读取车牌记录"""
+        for page in self.iter_record_pages(connection, table_name, page_size, start_after):
+            yield from page
+    
+    def stream_images_from_database(self, table_name='license_plates', page_size=500):
+        """逐条生成识别结果，内存占用与表大小无关"""
+        if not self.connect_to_database():
+            return
+        
+        connection = self.connection
+        count = 0
+        start = time.perf_counter()
+        
+        try:
+            for record in self.iter_records(connection, table_name, page_size):
+                result = self.process_record(record)
+                count += 1
+                if result is not None:
+                    yield result
+            
+            report_throughput(count, start)
         
         finally:
-            cursor.close()
-            self.disconnect_from_database()
+            if connection.is_connected():
+                connection.close()
+                print("数据库连接已关闭")
     
-    def save_results_to_database(self, results, result_table='recognition_results'):
-        """将识别结果保存回数据库"""
+    def process_images_from_database(self, table_name='license_plates', page_size=500):
+        """从数据库读取并处理车牌图片"""
+        return list(self.stream_images_from_database(table_name, page_size))
+    
+    def process_images_from_database_parallel(self, table_name='license_plates', workers=None, queue_size=64, page_size=500):
+        """多进程流水线处理：读取线程 -> 有界队列 -> 进程池识别 -> 汇总结果"""
         if not self.connect_to_database():
-            return False
+            return []
+        
+        workers = workers or os.cpu_count() or 1
+        # 有界队列，读取速度超过识别速度时阻塞读取线程，避免内存无限增长
+        record_queue = queue.Queue(maxsize=queue_size)
+        
+        def read_records():
+            try:
+                for record in self.iter_records(self.connection, table_name, page_size):
+                    record_queue.put(record)
+            except Error as e:
+                print(f"读取数据库记录时出错: {e}")
+            finally:
+                # 结束标记
+                record_queue.put(None)
+        
+        reader = threading.Thread(target=read_records, daemon=True)
+        results = []
+        count = 0
+        start = time.perf_counter()
         
         try:
-            cursor = self.connection.cursor()
+            # 读取线程会持有数据库连接的锁，用spawn启动工作进程，避免在多线程进程中fork；
+            # 进程池在读取线程启动之前创建
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(self,),
+                                     mp_context=multiprocessing.get_context('spawn')) as executor:
+                reader.start()
+                pending = set()
+                while True:
+                    record = record_queue.get()
+                    if record is None:
+                        break
+                    pending.add(executor.submit(_process_record_worker, record))
+                    count += 1
+                    
+                    # 限制在途任务数量，同时收集已完成的结果
+                    if len(pending) >= queue_size:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        results.extend(result for result in (f.result() for f in done) if result is not None)
+                
+                done, _ = wait(pending)
+                results.extend(result for result in (f.result() for f in done) if result is not None)
             
-            # 创建结果表（如果不存在）
+            reader.join()
+        finally:
+            self.disconnect_from_database()
+        
+        # 保持与串行处理一致的顺序
+        results.sort(key=lambda r: r['id'])
+        report_throughput(count, start)
+        return results
+    
+    def ensure_result_table(self, connection, result_table='recognition_results'):
+        """创建结果表（如果不存在），每个表只执行一次"""
+        if result_table in self.created_tables:
+            return
+        
+        cursor = connection.cursor()
+        try:
             create_table_query = f"""
             CREATE TABLE IF NOT EXISTS {result_table} (
                 id INT AUTO_INCREMENT PRIMARY KEY,
@@ -179,33 +739,436 @@ class LicensePlateRecognizer:
             )
             """
             cursor.execute(create_table_query)
-            
-            # 插入结果数据
-            insert_query = f"""
-            INSERT INTO {result_table} (plate_id, recognized_plate, is_correct)
-            VALUES (%s, %s, %s)
-            """
+            connection.commit()
+            self.created_tables.add(result_table)
+        finally:
+            cursor.close()
+    
+    def write_results(self, connection, results, result_table='recognition_results', batch_size=500, commit_every=10):
+        """分批写入识别结果，每commit_every批提交一次，返回写入条数"""
+        self.ensure_result_table(connection, result_table)
+        
+        # 插入结果数据（executemany会合并为多行INSERT）
+        insert_query = f"""
+        INSERT INTO {result_table} (plate_id, recognized_plate, is_correct)
+        VALUES (%s, %s, %s)
+        """
+        
+        cursor = connection.cursor()
+        try:
+            batch = []
+            batches = 0
+            written = 0
             
             for result in results:
-                if 'recognized_plate' in result:
-                    data = (
-                        result['id'],
-                        result['recognized_plate'],
-                        result.get('match', False)
-                    )
-                    cursor.execute(insert_query, data)
+                if 'recognized_plate' not in result:
+                    continue
+                batch.append((
+                    result['id'],
+                    result['recognized_plate'],
+                    result.get('match', False)
+                ))
+                
+                if len(batch) >= batch_size:
+                    with self.stage('db_write'):
+                        cursor.executemany(insert_query, batch)
+                    written += len(batch)
+                    batch = []
+                    batches += 1
+                    if batches % commit_every == 0:
+                        connection.commit()
             
-            self.connection.commit()
+            if batch:
+                with self.stage('db_write'):
+                    cursor.executemany(insert_query, batch)
+                written += len(batch)
+            
+            connection.commit()
+            return written
+        
+        finally:
+            cursor.close()
+    
+    def save_results_to_database(self, results, result_table='recognition_results', batch_size=500, commit_every=10):
+        """将识别结果保存回数据库"""
+        if not self.connect_to_database():
+            return False
+        
+        try:
+            self.write_results(self.connection, results, result_table, batch_size, commit_every)
             return True
         
         except Error as e:
+            # 已定期提交的批次不会被回滚
             print(f"保存结果到数据库时出错: {e}")
             self.connection.rollback()
             return False
         
+        finally:
+            self.disconnect_from_database()
+    
+    def process_and_save_results(self, table_name='license_plates', result_table='recognition_results',
+                                 page_size=500, batch_size=500, commit_every=10):
+        """读取、识别并写回结果，读写共用同一个连接池连接"""
+        if not self.connect_to_database():
+            return False
+        
+        connection = self.connection
+        count = 0
+        start = time.perf_counter()
+        
+        def results():
+            nonlocal count
+            for record in self.iter_records(connection, table_name, page_size):
+                result = self.process_record(record)
+                count += 1
+                if result is not None:
+                    yield result
+        
+        try:
+            written = self.write_results(connection, results(), result_table, batch_size, commit_every)
+            report_throughput(count, start)
+            print(f"共写入 {written} 条识别结果")
+            return True
+        
+        except Error as e:
+            print(f"保存结果到数据库时出错: {e}")
+            connection.rollback()
+            return False
+        
+        finally:
+            self.disconnect_from_database()
+    
+    def ensure_incremental_tables(self, connection, cache_table='plate_ocr_cache', watermark_table='recognition_watermarks',
+                                  failure_table='recognition_failures'):
+        """创建增量处理所需的缓存表、水位表和失败记录表（如果不存在）"""
+        if (cache_table, watermark_table, failure_table) in self.created_tables:
+            return
+        
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {cache_table} (
+                image_hash CHAR(64) PRIMARY KEY,
+                cached_result TEXT NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+            """)
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {watermark_table} (
+                table_name VARCHAR(64) PRIMARY KEY,
+                last_id INT NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+            """)
+            cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {failure_table} (
+                table_name VARCHAR(64) NOT NULL,
+                record_id INT NOT NULL,
+                attempts INT NOT NULL DEFAULT 1,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                PRIMARY KEY (table_name, record_id)
+            )
+            """)
+            connection.commit()
+            self.created_tables.add((cache_table, watermark_table, failure_table))
+        finally:
+            cursor.close()
+    
+    def get_watermark(self, connection, table_name='license_plates', watermark_table='recognition_watermarks'):
+        """读取上次处理到的最大记录ID，没有记录时返回None"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(f"SELECT last_id FROM {watermark_table} WHERE table_name = %s", (table_name,))
+            row = cursor.fetchone()
+            return row[0] if row else None
+        finally:
+            cursor.close()
+    
+    def get_failed_ids(self, connection, table_name='license_plates', failure_table='recognition_failures',
+                       max_attempts=3):
+        """读取之前处理失败、尝试次数未超过max_attempts的记录ID"""
+        cursor = connection.cursor()
+        try:
+            cursor.execute(
+                f"SELECT record_id FROM {failure_table} WHERE table_name = %s AND attempts < %s ORDER BY record_id",
+                (table_name, max_attempts)
+            )
+            return [row[0] for row in cursor.fetchall()]
         finally:
             cursor.close()
+    
+    def load_records(self, connection, record_ids, table_name='license_plates'):
+        """按ID读取车牌记录"""
+        if not record_ids:
+            return []
+        
+        cursor = connection.cursor(dictionary=True, buffered=True)
+        try:
+            placeholders = ', '.join(['%s'] * len(record_ids))
+            cursor.execute(
+                f"SELECT id, plate_image, plate_number FROM {table_name} WHERE id IN ({placeholders}) ORDER BY id",
+                list(record_ids)
+            )
+            return cursor.fetchall()
+        finally:
+            cursor.close()
+    
+    def cache_key(self, image_data):
+        """识别缓存键：检测参数与图片内容的SHA-256，检测参数不同的结果不会混用"""
+        digest = hashlib.sha256(f"detection_max_width={self.detection_max_width};".encode())
+        digest.update(image_data)
+        return digest.hexdigest()
+    
+    def lookup_cached_results(self, connection, image_hashes, cache_table='plate_ocr_cache'):
+        """批量查询图片哈希对应的缓存识别结果"""
+        if not image_hashes:
+            return {}
+        
+        cursor = connection.cursor()
+        try:
+            placeholders = ', '.join(['%s'] * len(image_hashes))
+            cursor.execute(
+                f"SELECT image_hash, cached_result FROM {cache_table} WHERE image_hash IN ({placeholders})",
+                list(image_hashes)
+            )
+            cached = {}
+            for image_hash, cached_result in cursor.fetchall():
+                image_size, plate_location, recognized_text = json.loads(cached_result)
+                cached[image_hash] = (
+                    tuple(image_size),
+                    tuple(plate_location) if plate_location else None,
+                    recognized_text
+                )
+            return cached
+        finally:
+            cursor.close()
+    
+    def process_incremental(self, table_name='license_plates', result_table='recognition_results',
+                            page_size=500, batch_size=500, commit_every=10,
+                            cache_table='plate_ocr_cache', watermark_table='recognition_watermarks',
+                            ocr_batch_size=32, failure_table='recognition_failures', max_attempts=3):
+        """增量处理：只处理水位之后的新记录，相同图片内容直接复用缓存结果
+
+        解码或识别出错的记录写入失败记录表，之后每次运行先重试这些记录，
+        尝试max_attempts次仍失败的不再重试；水位照常前进，不会被单条坏记录卡住。
+        """
+        if not self.connect_to_database():
+            return False
+        
+        connection = self.connection
+        stats = {'count': 0, 'cache_hits': 0, 'written': 0, 'failed': 0}
+        start = time.perf_counter()
+        
+        def process_page(page, advance_watermark):
+            hashes = [self.cache_key(record['plate_image']) for record in page]
+            cached = self.lookup_cached_results(connection, set(hashes), cache_table)
+            
+            # 未命中缓存的图片（同一页内重复的只分析一次）批量识别
+            uncached = {}
+            for record, image_hash in zip(page, hashes):
+                if image_hash not in cached and image_hash not in uncached:
+                    uncached[image_hash] = record
+            analyses = self.analyze_records(list(uncached.values()), ocr_batch_size)
+            
+            new_entries = []
+            for image_hash, analysis in zip(uncached, analyses):
+                if analysis is not None:
+                    cached[image_hash] = analysis
+                    # 未检测到车牌的结果不写入缓存，检测算法改进后这些图片还会被重新分析
+                    if analysis[1]:
+                        new_entries.append((image_hash, json.dumps(analysis)))
+            
+            results = []
+            failed_ids = []
+            for record, image_hash in zip(page, hashes):
+                stats['count'] += 1
+                if image_hash not in cached:
+                    failed_ids.append(record['id'])
+                    continue
+                if image_hash not in uncached:
+                    stats['cache_hits'] += 1
+                try:
+                    results.append(self.build_result(record, *cached[image_hash]))
+                except Exception as e:
+                    print(f"处理记录ID {record.get('id', 'unknown')} 时出错: {e}")
+                    failed_ids.append(record['id'])
+            stats['failed'] += len(failed_ids)
+            succeeded_ids = [result['id'] for result in results]
+            
+            # 缓存、失败记录、水位与本页结果在同一事务中提交
+            cursor = connection.cursor()
+            try:
+                if new_entries:
+                    cursor.executemany(
+                        f"INSERT IGNORE INTO {cache_table} (image_hash, cached_result) VALUES (%s, %s)",
+                        new_entries
+                    )
+                if failed_ids:
+                    cursor.executemany(
+                        f"INSERT INTO {failure_table} (table_name, record_id) VALUES (%s, %s) "
+                        f"ON DUPLICATE KEY UPDATE attempts = attempts + 1",
+                        [(table_name, record_id) for record_id in failed_ids]
+                    )
+                if not advance_watermark and succeeded_ids:
+                    placeholders = ', '.join(['%s'] * len(succeeded_ids))
+                    cursor.execute(
+                        f"DELETE FROM {failure_table} WHERE table_name = %s AND record_id IN ({placeholders})",
+                        [table_name] + succeeded_ids
+                    )
+                if advance_watermark:
+                    cursor.execute(
+                        f"INSERT INTO {watermark_table} (table_name, last_id) VALUES (%s, %s) "
+                        f"ON DUPLICATE KEY UPDATE last_id = VALUES(last_id)",
+                        (table_name, page[-1]['id'])
+                    )
+            finally:
+                cursor.close()
+            
+            stats['written'] += self.write_results(connection, results, result_table, batch_size, commit_every)
+        
+        try:
+            self.ensure_incremental_tables(connection, cache_table, watermark_table, failure_table)
+            # 建表会隐式提交，必须在分页循环之前完成，否则首页的缓存与水位会先于结果提交
+            self.ensure_result_table(connection, result_table)
+            
+            # 先重试之前失败的记录
+            failed_ids = self.get_failed_ids(connection, table_name, failure_table, max_attempts)
+            for i in range(0, len(failed_ids), page_size):
+                chunk = failed_ids[i:i + page_size]
+                page = self.load_records(connection, chunk, table_name)
+                found_ids = {record['id'] for record in page}
+                gone_ids = [record_id for record_id in chunk if record_id not in found_ids]
+                if gone_ids:
+                    # 源记录已被删除，不再重试
+                    cursor = connection.cursor()
+                    try:
+                        placeholders = ', '.join(['%s'] * len(gone_ids))
+                        cursor.execute(
+                            f"DELETE FROM {failure_table} WHERE table_name = %s AND record_id IN ({placeholders})",
+                            [table_name] + gone_ids
+                        )
+                    finally:
+                        cursor.close()
+                if page:
+                    process_page(page, advance_watermark=False)
+                else:
+                    connection.commit()
+            
+            watermark = self.get_watermark(connection, table_name, watermark_table)
+            for page in self.iter_record_pages(connection, table_name, page_size, watermark):
+                process_page(page, advance_watermark=True)
+            
+            report_throughput(stats['count'], start)
+            print(f"缓存命中 {stats['cache_hits']} 条，共写入 {stats['written']} 条识别结果，"
+                  f"失败 {stats['failed']} 条（已记入{failure_table}）")
+            return True
+        
+        except Error as e:
+            print(f"增量处理时出错: {e}")
+            connection.rollback()
+            return False
+        
+        finally:
             self.disconnect_from_database()
+    
+    def plate_quality(self, plate_image):
+        """车牌截图质量评分：清晰度（拉普拉斯方差）乘以面积"""
+        gray_plate = cv2.cvtColor(plate_image, cv2.COLOR_BGR2GRAY)
+        sharpness = cv2.Laplacian(gray_plate, cv2.CV_64F).var()
+        return sharpness * gray_plate.size
+    
+    def process_video(self, video_path, detect_every=1, iou_threshold=0.3, max_age=15, quality_gain=1.2):
+        """识别视频中的车牌，每条轨迹只在截图质量明显提升时重新OCR"""
+        capture = cv2.VideoCapture(video_path)
+        if not capture.isOpened():
+            print(f"无法打开视频文件: {video_path}")
+            return []
+        
+        tracker = PlateTracker(iou_threshold, max_age)
+        frame_index = -1
+        ocr_runs = 0
+        start = time.perf_counter()
+        
+        try:
+            while True:
+                frame_index += 1
+                # 跳过的帧只抓取不解码
+                if frame_index % detect_every:
+                    if not capture.grab():
+                        break
+                    continue
+                
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                
+                boxes = self.locate_plates(frame)
+                
+                for track, (x, y, w, h) in tracker.update(boxes, frame_index):
+                    plate_img = frame[y:y+h, x:x+w]
+                    quality = self.plate_quality(plate_img)
+                    if track['recognized_plate'] is None or quality > track['best_quality'] * quality_gain:
+                        track['recognized_plate'] = self.recognize_plate_text(plate_img)
+                        track['best_quality'] = quality
+                        track['plate_location'] = (x, y, w, h)
+                        track['ocr_runs'] += 1
+                        ocr_runs += 1
+        finally:
+            capture.release()
+        
+        elapsed = time.perf_counter() - start
+        frames = frame_index
+        fps = frames / elapsed if elapsed > 0 else 0.0
+        tracks = tracker.all_tracks()
+        print(f"共处理 {frames} 帧，耗时 {elapsed:.2f} 秒，{fps:.1f} 帧/秒，"
+              f"{len(tracks)} 条轨迹，OCR {ocr_runs} 次")
+        
+        return [
+            {
+                'track_id': track['track_id'],
+                'recognized_plate': track['recognized_plate'],
+                'plate_location': track.get('plate_location'),
+                'first_frame': track['first_frame'],
+                'last_frame': track['last_frame'],
+                'frames_seen': track['frames_seen'],
+                'ocr_runs': track['ocr_runs']
+            }
+            for track in tracks
+        ]
+
+
+# 进程池中每个工作进程持有的识别器实例
+_worker_recognizer = None
+
+
+def _init_worker(recognizer):
+    """工作进程初始化，保存进程内的识别器副本"""
+    global _worker_recognizer
+    _worker_recognizer = recognizer
+
+
+def _process_record_worker(record):
+    """在工作进程中处理单条记录"""
+    return _worker_recognizer.process_record(record)
+
+
+def box_iou(box_a, box_b):
+    """计算两个(x, y, w, h)矩形框的交并比"""
+    ax, ay, aw, ah = box_a
+    bx, by, bw, bh = box_b
+    inter_w = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    inter_h = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = inter_w * inter_h
+    union = aw * ah + bw * bh - inter
+    return inter / union if union > 0 else 0.0
+
+
+def report_throughput(count, start):
+    """打印处理数量与吞吐量"""
+    elapsed = time.perf_counter() - start
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"共处理 {count} 条记录，耗时 {elapsed:.2f} 秒，{rate:.1f} 条/秒")
 
 
 if __name__ == "__main__":
@@ -221,8 +1184,8 @@ if __name__ == "__main__":
     # 创建识别器实例
     recognizer = LicensePlateRecognizer(db_config)
     
-    # 处理数据库中的车牌图片
-    results = recognizer.process_images_from_database()
+    # 多进程处理数据库中的车牌图片
+    results = recognizer.process_images_from_database_parallel()
     
     # 打印结果
     print("\n识别结果:")
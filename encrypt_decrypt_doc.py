@@ -1,114 +1,460 @@
-import os
-import sys
-import logging
-import argparse
-import configparser
-from datetime import datetime
-from cryptography.hazmat.primitives import serialization
-from cryptography.hazmat.primitives.asymmetric import rsa
-from cryptography.hazmat.backends import default_backend
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.asymmetric import padding
-from docx import Document
-
-def generate_key_pair(private_key_file, public_key_file):
-    private_key = rsa.generate_private_key(
-        public_exponent=65537,
-        key_size=2048,
-        backend=default_backend()
-    )
-    public_key = private_key.public_key()
-
-    with open(private_key_file, "wb") as key_file:
-        key_file.write(private_key.private_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PrivateFormat.TraditionalOpenSSL,
-            encryption_algorithm=serialization.NoEncryption()
-        ))
-
-    with open(public_key_file, "wb") as key_file:
-        key_file.write(public_key.public_bytes(
-            encoding=serialization.Encoding.PEM,
-            format=serialization.PublicFormat.SubjectPublicKeyInfo
-        ))
-
-def load_key_from_file(file_name):
-    with open(file_name, "rb") as key_file:
-        key_data = key_file.read()
-        key = serialization.load_pem_private_key(key_data, password=None, backend=default_backend())
-    return key
-
-def encrypt_document(document_path, public_key, log_file):
-    logging.info(f"Encrypting document: {document_path}")
-    with open(document_path, 'rb') as doc_file:
-        document_content = doc_file.read()
-
-    encrypted_content = public_key.encrypt(
-        document_content,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
-
-    encrypted_file_path = document_path + ".encrypted"
-    with open(encrypted_file_path, 'wb') as encrypted_file:
-        encrypted_file.write(encrypted_content)
-
-    logging.info(f"Document encrypted: {encrypted_file_path}")
-    log_file.write(f"{datetime.now()} - Document encrypted: {encrypted_file_path}\n")
-
-def decrypt_document(encrypted_document_path, private_key, log_file):
-    logging.info(f"Decrypting document: {encrypted_document_path}")
-    with open(encrypted_document_path, 'rb') as encrypted_file:
-        encrypted_content = encrypted_file.read()
-
-    decrypted_content = private_key.decrypt(
-        encrypted_content,
-        padding.OAEP(
-            mgf=padding.MGF1(algorithm=hashes.SHA256()),
-            algorithm=hashes.SHA256(),
-            label=None
-        )
-    )
-
-    original_document_path = encrypted_document_path.replace('.encrypted', '')
-    with open(original_document_path, 'wb') as decrypted_file:
-        decrypted_file.write(decrypted_content)
-
-    logging.info(f"Document decrypted: {original_document_path}")
-    log_file.write(f"{datetime.now()} - Document decrypted: {original_document_path}\n")
-
-def process_documents(directory_path, key_file, log_file, action):
-    if action == 'encrypt':
-        logging.info("Starting encryption process.")
-        public_key = load_key_from_file(key_file)
-        for filename in os.listdir(directory_path):
-            if filename.endswith('.doc') or filename.endswith('.docx'):
-                file_path = os.path.join(directory_path, filename)
-                encrypt_document(file_path, public_key, log_file)
-        logging.info("Encryption process completed.")
-    elif action == 'decrypt':
-        logging.info("Starting decryption process.")
-        private_key = load_key_from_file(key_file)
-        for filename in os.listdir(directory_path):
-            if filename.endswith('.encrypted'):
-                file_path = os.path.join(directory_path, filename)
-                decrypt_document(file_path, private_key, log_file)
-        logging.info("Decryption process completed.")
-
-def main():
-    parser = argparse.ArgumentParser(description='Encrypt or decrypt documents.')
-    parser.add_argument('--action', choices=['encrypt', 'decrypt'], required=True, help='Action to perform: encrypt or decrypt.')
-    parser.add_argument('--directory', required=True, help='Directory path containing documents.')
-    parser.add_argument('--key-file', required=True, help='Key file path (private key for decryption, public key for encryption).')
-    parser.add_argument('--log-file', default='encryption.log', help='Log file path.')
-    args = parser.parse_args()
-
-    logging.basicConfig(filename=args.log_file, level=logging.INFO)
-
-    process_documents(args.directory, args.key_file, args.log_file, args.action)
-
-if __name__ == "__main__":
-    main()
+import io
+import os
+import mmap
+import sys
+import json
+import time
+import struct
+import hashlib
+import logging
+import argparse
+import configparser
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.asymmetric import padding
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+from docx import Document
+
+# Envelope format: header (magic, chunk size, wrapped key length), the
+# RSA-wrapped AES-256 key, a random nonce prefix, then AES-GCM chunks.
+MAGIC = b'DOCENC\x00\x01'
+HEADER_FORMAT = '>8sIH'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+NONCE_PREFIX_SIZE = 7
+TAG_SIZE = 16
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+MANIFEST_NAME = '.document_manifest.json'
+
+def oaep_padding():
+    return padding.OAEP(
+        mgf=padding.MGF1(algorithm=hashes.SHA256()),
+        algorithm=hashes.SHA256(),
+        label=None
+    )
+
+def chunk_nonce(nonce_prefix, index, last):
+    # The last-chunk flag in the nonce makes truncation detectable.
+    return nonce_prefix + struct.pack('>I', index) + (b'\x01' if last else b'\x00')
+
+def generate_key_pair(private_key_file, public_key_file):
+    private_key = rsa.generate_private_key(
+        public_exponent=65537,
+        key_size=2048,
+        backend=default_backend()
+    )
+    public_key = private_key.public_key()
+
+    with open(private_key_file, "wb") as key_file:
+        key_file.write(private_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            encryption_algorithm=serialization.NoEncryption()
+        ))
+
+    with open(public_key_file, "wb") as key_file:
+        key_file.write(public_key.public_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PublicFormat.SubjectPublicKeyInfo
+        ))
+
+def load_key_from_file(file_name):
+    with open(file_name, "rb") as key_file:
+        key_data = key_file.read()
+        if b'PUBLIC KEY' in key_data:
+            key = serialization.load_pem_public_key(key_data, backend=default_backend())
+        else:
+            key = serialization.load_pem_private_key(key_data, password=None, backend=default_backend())
+    return key
+
+def load_public_key(file_name):
+    key = load_key_from_file(file_name)
+    # A private key file also carries the public key.
+    if isinstance(key, rsa.RSAPrivateKey):
+        key = key.public_key()
+    return key
+
+def log_throughput(message, path, size, start, log_file):
+    elapsed = time.perf_counter() - start
+    mb_per_sec = size / elapsed / 1e6 if elapsed > 0 else 0.0
+    logging.info(f"{message}: {path} ({size / 1e6:.2f} MB, {mb_per_sec:.1f} MB/s)")
+    log_file.write(f"{datetime.now()} - {message}: {path} ({size / 1e6:.2f} MB, {mb_per_sec:.1f} MB/s)\n")
+
+# Incremental writer for the envelope format. Full chunks are encrypted as
+# data arrives; the last one is held back until close() so it can be flagged.
+class EnvelopeWriter:
+    def __init__(self, encrypted_file, public_key, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.encrypted_file = encrypted_file
+        self.chunk_size = chunk_size
+        file_key = AESGCM.generate_key(bit_length=256)
+        self.aesgcm = AESGCM(file_key)
+        self.nonce_prefix = os.urandom(NONCE_PREFIX_SIZE)
+        wrapped_key = public_key.encrypt(file_key, oaep_padding())
+        self.header = struct.pack(HEADER_FORMAT, MAGIC, chunk_size, len(wrapped_key)) + wrapped_key + self.nonce_prefix
+        encrypted_file.write(self.header)
+        self.buffer = bytearray()
+        self.index = 0
+        self.size = 0
+
+    def write(self, data):
+        self.buffer += data
+        self.size += len(data)
+        while len(self.buffer) > self.chunk_size:
+            self.write_chunk(bytes(self.buffer[:self.chunk_size]), last=False)
+            del self.buffer[:self.chunk_size]
+
+    def write_chunk(self, chunk, last):
+        nonce = chunk_nonce(self.nonce_prefix, self.index, last)
+        self.encrypted_file.write(self.aesgcm.encrypt(nonce, chunk, self.header))
+        self.index += 1
+
+    def close(self):
+        self.write_chunk(bytes(self.buffer), last=True)
+        self.buffer = bytearray()
+
+def encrypt_document(document_path, public_key, log_file, chunk_size=DEFAULT_CHUNK_SIZE):
+    logging.info(f"Encrypting document: {document_path}")
+    start = time.perf_counter()
+
+    encrypted_file_path = document_path + ".encrypted"
+    with open(document_path, 'rb') as doc_file, open(encrypted_file_path, 'wb') as encrypted_file:
+        writer = EnvelopeWriter(encrypted_file, public_key, chunk_size)
+        for block in iter(lambda: doc_file.read(chunk_size), b''):
+            writer.write(block)
+        writer.close()
+
+    log_throughput("Document encrypted", encrypted_file_path, writer.size, start, log_file)
+
+def read_envelope_header(encrypted_file):
+    # Returns (chunk size, wrapped key, nonce prefix, full header bytes), or
+    # None for a legacy single-block file. Leaves the file at the first chunk.
+    fixed_header = encrypted_file.read(HEADER_SIZE)
+    if len(fixed_header) < HEADER_SIZE or not fixed_header.startswith(MAGIC):
+        encrypted_file.seek(0)
+        return None
+    _, chunk_size, key_length = struct.unpack(HEADER_FORMAT, fixed_header)
+    wrapped_key = encrypted_file.read(key_length)
+    nonce_prefix = encrypted_file.read(NONCE_PREFIX_SIZE)
+    return chunk_size, wrapped_key, nonce_prefix, fixed_header + wrapped_key + nonce_prefix
+
+def decrypt_legacy_document(encrypted_file, private_key):
+    # Files written before the envelope format are a single RSA block.
+    return private_key.decrypt(encrypted_file.read(), oaep_padding())
+
+def decrypt_document(encrypted_document_path, private_key, log_file):
+    logging.info(f"Decrypting document: {encrypted_document_path}")
+    start = time.perf_counter()
+
+    original_document_path = encrypted_document_path.replace('.encrypted', '')
+    partial_path = original_document_path + ".partial"
+    total_size = 0
+    with open(encrypted_document_path, 'rb') as encrypted_file:
+        envelope = read_envelope_header(encrypted_file)
+        if envelope is None:
+            decrypted_content = decrypt_legacy_document(encrypted_file, private_key)
+            with open(original_document_path, 'wb') as decrypted_file:
+                decrypted_file.write(decrypted_content)
+            log_throughput("Document decrypted", original_document_path, len(decrypted_content), start, log_file)
+            return
+
+        chunk_size, wrapped_key, nonce_prefix, header = envelope
+        aesgcm = AESGCM(private_key.decrypt(wrapped_key, oaep_padding()))
+
+        # Plaintext goes to a temporary file and only replaces the target
+        # once every chunk, including the final one, has authenticated.
+        try:
+            with open(partial_path, 'wb') as decrypted_file:
+                block = encrypted_file.read(chunk_size + TAG_SIZE)
+                index = 0
+                while True:
+                    next_block = encrypted_file.read(chunk_size + TAG_SIZE)
+                    last = not next_block
+                    chunk = aesgcm.decrypt(chunk_nonce(nonce_prefix, index, last), block, header)
+                    decrypted_file.write(chunk)
+                    total_size += len(chunk)
+                    if last:
+                        break
+                    block = next_block
+                    index += 1
+            os.replace(partial_path, original_document_path)
+        except Exception:
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+            raise
+
+    log_throughput("Document decrypted", original_document_path, total_size, start, log_file)
+
+# Random-access reader for envelope files. Chunks have a fixed size at fixed
+# offsets after the header, so a byte range maps directly to the chunks that
+# cover it; only those are read from the memory map and authenticated.
+class EncryptedDocumentReader:
+
+    def __init__(self, encrypted_document_path, private_key):
+        self.encrypted_file = open(encrypted_document_path, 'rb')
+        try:
+            envelope = read_envelope_header(self.encrypted_file)
+            if envelope is None:
+                raise ValueError(f"Not a chunked envelope file: {encrypted_document_path}")
+            self.chunk_size, wrapped_key, self.nonce_prefix, self.header = envelope
+            self.aesgcm = AESGCM(private_key.decrypt(wrapped_key, oaep_padding()))
+            self.mapped = mmap.mmap(self.encrypted_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self.encrypted_file.close()
+            raise
+
+        body_size = len(self.mapped) - len(self.header)
+        encrypted_chunk_size = self.chunk_size + TAG_SIZE
+        self.chunk_count = max(1, -(-body_size // encrypted_chunk_size))
+        self.size = body_size - self.chunk_count * TAG_SIZE
+        self.cached_index = None
+        self.cached_chunk = None
+
+    def read_chunk(self, index):
+        if index == self.cached_index:
+            return self.cached_chunk
+        start = len(self.header) + index * (self.chunk_size + TAG_SIZE)
+        block = self.mapped[start:start + self.chunk_size + TAG_SIZE]
+        last = index == self.chunk_count - 1
+        chunk = self.aesgcm.decrypt(chunk_nonce(self.nonce_prefix, index, last), block, self.header)
+        self.cached_index, self.cached_chunk = index, chunk
+        return chunk
+
+    def read(self, offset, length):
+        if offset < 0 or length < 0:
+            raise ValueError("Offset and length must be non-negative.")
+        end = min(offset + length, self.size)
+        if offset >= end:
+            return b''
+        first, last = offset // self.chunk_size, (end - 1) // self.chunk_size
+        data = b''.join(self.read_chunk(index) for index in range(first, last + 1))
+        skip = offset - first * self.chunk_size
+        return data[skip:skip + end - offset]
+
+    def close(self):
+        self.mapped.close()
+        self.encrypted_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+def read_document_range(encrypted_document_path, private_key, offset, length):
+    with EncryptedDocumentReader(encrypted_document_path, private_key) as reader:
+        return reader.read(offset, length)
+
+# A bundle is one envelope file whose plaintext is every member's bytes back
+# to back, followed by a JSON table of contents and its 8-byte length. The
+# whole directory shares one wrapped key, and the TOC is encrypted with the
+# data. Members are read back by byte range without decrypting the rest.
+TOC_LENGTH_FORMAT = '>Q'
+TOC_LENGTH_SIZE = struct.calcsize(TOC_LENGTH_FORMAT)
+
+def create_bundle(directory_path, bundle_path, public_key, log_file, chunk_size=DEFAULT_CHUNK_SIZE):
+    logging.info(f"Creating bundle {bundle_path} from {directory_path}")
+    start = time.perf_counter()
+
+    members = []
+    with open(bundle_path, 'wb') as bundle_file:
+        writer = EnvelopeWriter(bundle_file, public_key, chunk_size)
+        for file_path in find_documents(directory_path, 'encrypt'):
+            offset = writer.size
+            with open(file_path, 'rb') as doc_file:
+                for block in iter(lambda: doc_file.read(chunk_size), b''):
+                    writer.write(block)
+            members.append({
+                'path': os.path.relpath(file_path, directory_path).replace(os.sep, '/'),
+                'offset': offset,
+                'size': writer.size - offset,
+                'mtime': os.path.getmtime(file_path)
+            })
+        toc = json.dumps(members).encode('utf-8')
+        writer.write(toc)
+        writer.write(struct.pack(TOC_LENGTH_FORMAT, len(toc)))
+        writer.close()
+
+    log_throughput(f"Bundle created with {len(members)} documents", bundle_path, writer.size, start, log_file)
+    return members
+
+def read_bundle_toc(reader):
+    toc_length, = struct.unpack(TOC_LENGTH_FORMAT, reader.read(reader.size - TOC_LENGTH_SIZE, TOC_LENGTH_SIZE))
+    return json.loads(reader.read(reader.size - TOC_LENGTH_SIZE - toc_length, toc_length))
+
+def list_bundle(bundle_path, private_key):
+    with EncryptedDocumentReader(bundle_path, private_key) as reader:
+        return read_bundle_toc(reader)
+
+def extract_bundle(bundle_path, private_key, output_directory, log_file, members=None):
+    logging.info(f"Extracting bundle {bundle_path} to {output_directory}")
+    start = time.perf_counter()
+
+    output_root = os.path.abspath(output_directory)
+    total_size = 0
+    extracted = []
+    with EncryptedDocumentReader(bundle_path, private_key) as reader:
+        toc = read_bundle_toc(reader)
+        wanted = set(members) if members else None
+        if wanted:
+            missing = wanted - {member['path'] for member in toc}
+            if missing:
+                raise KeyError(f"Not in bundle: {', '.join(sorted(missing))}")
+
+        for member in toc:
+            if wanted and member['path'] not in wanted:
+                continue
+            target_path = os.path.abspath(os.path.join(output_root, member['path']))
+            if os.path.commonpath([output_root, target_path]) != output_root:
+                raise ValueError(f"Unsafe member path in bundle: {member['path']}")
+            os.makedirs(os.path.dirname(target_path), exist_ok=True)
+            with open(target_path, 'wb') as doc_file:
+                for offset in range(member['offset'], member['offset'] + member['size'], reader.chunk_size):
+                    end = min(offset + reader.chunk_size, member['offset'] + member['size'])
+                    doc_file.write(reader.read(offset, end - offset))
+            os.utime(target_path, (member['mtime'], member['mtime']))
+            total_size += member['size']
+            extracted.append(member['path'])
+
+    log_throughput(f"Bundle extracted ({len(extracted)} documents)", output_directory, total_size, start, log_file)
+    return extracted
+
+def output_path(file_path, action):
+    if action == 'encrypt':
+        return file_path + ".encrypted"
+    return file_path.replace('.encrypted', '')
+
+def find_documents(directory_path, action):
+    suffixes = ('.doc', '.docx') if action == 'encrypt' else ('.encrypted',)
+    for root, _, filenames in os.walk(directory_path):
+        for filename in sorted(filenames):
+            if filename.endswith(suffixes):
+                yield os.path.join(root, filename)
+
+def file_digest(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(DEFAULT_CHUNK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(manifest_path):
+    if not os.path.exists(manifest_path):
+        return {}
+    with open(manifest_path, 'r') as manifest_file:
+        return json.load(manifest_file)
+
+def save_manifest(manifest, manifest_path):
+    temp_path = manifest_path + ".tmp"
+    with open(temp_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file, indent=1, sort_keys=True)
+    os.replace(temp_path, manifest_path)
+
+# Key loaded once per worker process; key objects cannot be pickled.
+_worker_key = None
+
+def init_document_worker(key_file, action):
+    global _worker_key
+    _worker_key = load_public_key(key_file) if action == 'encrypt' else load_key_from_file(key_file)
+
+def process_document_file(file_path, action, known_digest=None):
+    # Runs in a worker process. Errors are returned rather than raised so
+    # one bad file does not stop the rest of the run.
+    log_buffer = io.StringIO()
+    try:
+        digest = file_digest(file_path)
+        if digest == known_digest and os.path.exists(output_path(file_path, action)):
+            return {'status': 'unchanged', 'sha256': digest, 'size': 0, 'log': ''}
+        if action == 'encrypt':
+            encrypt_document(file_path, _worker_key, log_buffer)
+        else:
+            decrypt_document(file_path, _worker_key, log_buffer)
+        return {'status': 'done', 'sha256': digest, 'size': os.path.getsize(file_path), 'log': log_buffer.getvalue()}
+    except Exception as e:
+        logging.error(f"Failed to {action} {file_path}: {e}")
+        return {'status': 'failed', 'error': str(e), 'size': 0, 'log': log_buffer.getvalue()}
+
+def process_documents(directory_path, key_file, log_file, action, workers=None, manifest_path=None):
+    label = 'Encryption' if action == 'encrypt' else 'Decryption'
+    logging.info(f"Starting {label.lower()} process.")
+    start = time.perf_counter()
+
+    manifest_path = manifest_path or os.path.join(directory_path, MANIFEST_NAME)
+    manifest = load_manifest(manifest_path)
+    entries = manifest.setdefault(action, {})
+    counts = {'done': 0, 'unchanged': 0, 'skipped': 0, 'failed': 0}
+    total_size = 0
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_document_worker,
+                             initargs=(key_file, action)) as executor:
+        futures = {}
+        for file_path in find_documents(directory_path, action):
+            relative_path = os.path.relpath(file_path, directory_path)
+            stat = os.stat(file_path)
+            entry = entries.get(relative_path)
+            # Unchanged size and mtime with the output still present: skip
+            # without reading the file at all.
+            if (entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime
+                    and os.path.exists(output_path(file_path, action))):
+                counts['skipped'] += 1
+                continue
+            future = executor.submit(process_document_file, file_path, action, entry['sha256'] if entry else None)
+            futures[future] = (relative_path, stat)
+
+        for completed, future in enumerate(as_completed(futures), 1):
+            relative_path, stat = futures[future]
+            result = future.result()
+            log_file.write(result['log'])
+            counts[result['status']] += 1
+            total_size += result['size']
+            if result['status'] == 'failed':
+                print(f"Failed: {relative_path}: {result['error']}")
+                continue
+            entries[relative_path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'sha256': result['sha256']}
+            if completed % 100 == 0:
+                save_manifest(manifest, manifest_path)
+                print(f"{completed}/{len(futures)} files processed")
+
+    save_manifest(manifest, manifest_path)
+
+    elapsed = time.perf_counter() - start
+    mb_per_sec = total_size / elapsed / 1e6 if elapsed > 0 else 0.0
+    summary = (f"{label} finished in {elapsed:.2f}s: {counts['done']} processed, "
+               f"{counts['skipped'] + counts['unchanged']} skipped, {counts['failed']} failed, "
+               f"{total_size / 1e6:.2f} MB at {mb_per_sec:.1f} MB/s")
+    print(summary)
+    logging.info(summary)
+    logging.info(f"{label} process completed.")
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description='Encrypt or decrypt documents.')
+    parser.add_argument('--action', choices=['encrypt', 'decrypt', 'bundle', 'extract'], required=True,
+                        help='Action to perform: encrypt, decrypt, bundle (pack a directory into one archive) or extract.')
+    parser.add_argument('--directory', required=True, help='Directory path containing documents (output directory for extract).')
+    parser.add_argument('--bundle', help='Bundle archive path; required for extract, defaults to <directory>.bundle for bundle.')
+    parser.add_argument('--member', action='append', help='Member to extract from a bundle; repeat for several (default: all).')
+    parser.add_argument('--key-file', required=True, help='Key file path (private key for decryption, public key for encryption).')
+    parser.add_argument('--log-file', default='encryption.log', help='Log file path.')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: CPU count).')
+    parser.add_argument('--manifest', default=None, help=f'Manifest file path (default: {MANIFEST_NAME} in the directory).')
+    args = parser.parse_args()
+    if args.action == 'extract' and not args.bundle:
+        # For extract, --directory is the output directory, so it cannot name the archive.
+        parser.error('--bundle is required for --action extract')
+
+    logging.basicConfig(filename=args.log_file, level=logging.INFO)
+
+    bundle_path = args.bundle or args.directory.rstrip(os.sep) + '.bundle'
+    with open(args.log_file, 'a') as log_file:
+        if args.action == 'bundle':
+            create_bundle(args.directory, bundle_path, load_public_key(args.key_file), log_file)
+        elif args.action == 'extract':
+            extract_bundle(bundle_path, load_key_from_file(args.key_file), args.directory, log_file, args.member)
+        else:
+            process_documents(args.directory, args.key_file, log_file, args.action, args.workers, args.manifest)
+
+if __name__ == "__main__":
+    main()